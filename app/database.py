@@ -1,10 +1,34 @@
-from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine, Session
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
 import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
 
-sqlite_file_name = "putzplan.db"
+from app.utils.tenants import TENANT_DIR, current_tenant, tenant_db_path
+
+sqlite_file_name = os.getenv("PUTZPLAN_DB_PATH", "putzplan.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
+# Engine-Konfiguration (per Umgebungsvariable überschreibbar)
+DB_POOL_SIZE = int(os.getenv("PUTZPLAN_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("PUTZPLAN_DB_MAX_OVERFLOW", "10"))
+DB_JOURNAL_MODE = os.getenv("PUTZPLAN_DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("PUTZPLAN_DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("PUTZPLAN_DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KIB = int(os.getenv("PUTZPLAN_DB_CACHE_SIZE_KIB", "8192"))
+# Optionaler async-Pfad für die lesenden Routen (braucht aiosqlite)
+ASYNC_DB_ENABLED = os.getenv("PUTZPLAN_ASYNC_DB", "0") == "1"
+# Multi-WG-Modus (s. app/utils/tenants.py): höchstens so viele Tenant-Engines offen
+TENANT_CACHE_SIZE = int(os.getenv("PUTZPLAN_TENANT_CACHE_SIZE", "32"))
+TENANT_IDLE_SECONDS = int(os.getenv("PUTZPLAN_TENANT_IDLE_SECONDS", "600"))
+TENANT_POOL_SIZE = int(os.getenv("PUTZPLAN_TENANT_POOL_SIZE", "2"))
+
 def set_logging_sql(logging_level: int):
     logger = logging.getLogger("sqlalchemy.engine")
     logger.setLevel(logging_level)
@@ -15,17 +39,206 @@ def set_logging_sql(logging_level: int):
         handler.setFormatter(formatter)
         logger.addHandler(handler)
 
-engine = create_engine(
-    sqlite_url,
-    #echo=True,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-    logging_name="sqlalchemy.engine",
-)
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL: Leser blockieren Schreiber nicht (und umgekehrt)
+    cursor.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
+    # NORMAL reicht mit WAL: kein fsync pro Commit, nur beim Checkpoint
+    cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    # negativer Wert = Größe in KiB statt in Seiten
+    cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KIB}")
+    cursor.close()
+
+def create_db_engine(url: str = sqlite_url, pool_size: int = DB_POOL_SIZE) -> Engine:
+    """
+    Engine mit Connection-Pool: jeder Threadpool-Worker bekommt für die Dauer
+    seiner Session eine eigene SQLite-Connection statt einer gemeinsamen.
+    """
+    db_engine = create_engine(
+        url,
+        #echo=True,
+        connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=DB_MAX_OVERFLOW,
+        logging_name="sqlalchemy.engine",
+    )
+    event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+engine = create_db_engine()
+
+def create_async_db_engine(path: str = sqlite_file_name):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    db_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+    event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+async_engine = None
+if ASYNC_DB_ENABLED:
+    try:
+        import aiosqlite  # noqa: F401
+        async_engine = create_async_db_engine()
+    except ImportError:
+        logging.getLogger(__name__).warning("PUTZPLAN_ASYNC_DB=1, aber aiosqlite ist nicht installiert -> sync-Pfad")
+        ASYNC_DB_ENABLED = False
+
+
+# Schema/Tabellen: app/migrations.py (PRAGMA user_version statt create_all bei jedem Start)
+
+# Wird für jede neu geöffnete Tenant-DB aufgerufen (Migrationen; s. main.py)
+_engine_initializers: List[Callable[[Engine], None]] = []
+
+def register_engine_init(initializer: Callable[[Engine], None]):
+    _engine_initializers.append(initializer)
+
+
+class TenantEngineCache:
+    """
+    LRU-Cache der Tenant-Engines: höchstens `size` offene Datenbanken, Engines, die länger als
+    `idle_seconds` nicht benutzt wurden, werden beim nächsten Zugriff geschlossen.
+    Laufende Requests behalten ihre Connection; dispose() schließt nur freie Connections.
+    """
+
+    def __init__(self, size: int = TENANT_CACHE_SIZE, idle_seconds: int = TENANT_IDLE_SECONDS):
+        self.size = size
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._engines: "OrderedDict[str, List]" = OrderedDict()  # tenant -> [engine, last_used]
+
+    def get(self, tenant: str) -> Engine:
+        db_engine = self._touch(tenant)
+        if db_engine is None:
+            # Öffnen (inkl. Migrationen) serialisieren, sonst migrieren zwei Threads dieselbe Datei
+            with self._open_lock:
+                db_engine = self._touch(tenant)
+                if db_engine is None:
+                    db_engine = self._open(tenant)
+                    with self._lock:
+                        self._engines[tenant] = [db_engine, time.monotonic()]
+        with self._lock:
+            evicted = self._collect_evictions(time.monotonic(), keep=tenant)
+        for old_engine in evicted:
+            old_engine.dispose()
+        return db_engine
+
+    def _touch(self, tenant: str) -> Optional[Engine]:
+        with self._lock:
+            entry = self._engines.get(tenant)
+            if entry is None:
+                return None
+            entry[1] = time.monotonic()
+            self._engines.move_to_end(tenant)
+            return entry[0]
+
+    def _open(self, tenant: str) -> Engine:
+        os.makedirs(TENANT_DIR, exist_ok=True)
+        db_engine = create_db_engine(f"sqlite:///{tenant_db_path(tenant)}", pool_size=TENANT_POOL_SIZE)
+        token = current_tenant.set(tenant)
+        try:
+            for initializer in _engine_initializers:
+                initializer(db_engine)
+        finally:
+            current_tenant.reset(token)
+        return db_engine
+
+    def _collect_evictions(self, now: float, keep: str) -> List[Engine]:
+        evicted = []
+        while len(self._engines) > self.size:
+            _, (old_engine, _) = self._engines.popitem(last=False)
+            evicted.append(old_engine)
+        for tenant in [t for t, (_, last_used) in self._engines.items() if t != keep and now - last_used > self.idle_seconds]:
+            evicted.append(self._engines.pop(tenant)[0])
+        return evicted
+
+    def open_tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._engines)
 
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+tenant_engines = TenantEngineCache()
+
+
+def get_engine() -> Engine:
+    """Engine des aktuellen Tenants (ohne Tenant: die normale Datenbank)."""
+    tenant = current_tenant.get()
+    return engine if tenant is None else tenant_engines.get(tenant)
+
+def current_db_path() -> str:
+    tenant = current_tenant.get()
+    return sqlite_file_name if tenant is None else tenant_db_path(tenant)
 
 def get_session():
-    return Session(engine)
+    """
+    Eine Session = eine Transaktion pro Request. Die Route committet genau einmal;
+    fliegt vorher eine Exception (auch HTTPException), wird alles zurückgerollt.
+    Danach wird die Session geschlossen und die Connection geht zurück in den Pool.
+    """
+    session = Session(get_engine())
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+class AsyncReadSession:
+    """Lesezugriffe über aiosqlite: I/O-Wartezeit blockiert keinen Threadpool-Slot."""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def all(self, stmt):
+        return (await self.session.exec(stmt)).all()
+
+    async def first(self, stmt):
+        return (await self.session.exec(stmt)).first()
+
+    async def get(self, model, ident):
+        return await self.session.get(model, ident)
+
+
+class ThreadedReadSession:
+    """Kompatibilitätspfad: dieselbe Schnittstelle, aber sync-Session im Threadpool."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def all(self, stmt):
+        return await run_in_threadpool(lambda: self.session.exec(stmt).all())
+
+    async def first(self, stmt):
+        return await run_in_threadpool(lambda: self.session.exec(stmt).first())
+
+    async def get(self, model, ident):
+        return await run_in_threadpool(self.session.get, model, ident)
+
+
+async def get_read_session():
+    """
+    Dependency für die heißen, rein lesenden Routen.
+    Mit PUTZPLAN_ASYNC_DB=1 async über aiosqlite, sonst die normale sync-Session im Threadpool.
+    Tenant-Datenbanken laufen immer über den sync-Pfad.
+    """
+    if async_engine is not None and current_tenant.get() is None:
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield AsyncReadSession(session)
+    else:
+        # Engine-Lookup kann eine Tenant-DB öffnen (Datei-I/O) -> Threadpool
+        session = Session(await run_in_threadpool(get_engine))
+        try:
+            yield ThreadedReadSession(session)
+        finally:
+            await run_in_threadpool(session.close)
@@ -1,23 +1,56 @@
 from fastapi import FastAPI
-from app.database import create_db_and_tables, set_logging_sql
-from app.routes import users, tasks, logs, backup
-from app.utils.logging import log_task_action
+from app.database import set_logging_sql, engine, register_engine_init
+from app.routes import users, tasks, logs, backup, events, dashboard, forecast, credits, stats, metrics
+from app.migrations import run_migrations
+from app.utils.jobs import run_scheduled_jobs
+from app.utils.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.utils.slowlog import SLOW_LOG_ENABLED, SlowRequestMiddleware, configure_slow_log
+from app.utils.scheduler import start_scheduler, stop_scheduler
+from app.utils.tenants import TenantMiddleware
 import logging
 app = FastAPI()
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if SLOW_LOG_ENABLED:
+    app.add_middleware(SlowRequestMiddleware)
+# zuletzt hinzugefügt = äußerste Middleware: alles dahinter kennt schon den Tenant
+app.add_middleware(TenantMiddleware)
+
 
 putzplanVersion="0.7.dev"
 
 @app.on_event("startup")
 def on_startup():
     set_logging_sql(logging.WARNING)  # oder logging.DEBUG
-    create_db_and_tables()
+    # Langsame Statements/Requests als JSON (Schwellen: PUTZPLAN_SLOW_QUERY_MS / PUTZPLAN_SLOW_REQUEST_MS)
+    configure_slow_log()
+    # Nur ausstehende Migrationen (Spalten, Indizes, Backfills); ist das Schema aktuell, ist das eine PRAGMA-Abfrage
+    run_migrations(engine)
+
+# Jede neu geöffnete Tenant-DB wird genauso auf den aktuellen Stand gebracht
+register_engine_init(run_migrations)
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    start_scheduler(run_scheduled_jobs)
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await stop_scheduler()
 
 
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(logs.router, prefix="/api/logs", tags=["logs"])
 app.include_router(backup.router, prefix="/api/backup", tags=["backup"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(forecast.router, prefix="/api/forecast", tags=["forecast"])
+app.include_router(credits.router, prefix="/api/credits", tags=["credits"])
+app.include_router(stats.router, prefix="/api/stats", tags=["stats"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["metrics"])
 
 
 @app.get("/api/putzplanVersion")
@@ -0,0 +1,337 @@
+import logging
+import os
+import time
+from typing import Callable, List, Sequence, Set, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import load_only
+from sqlmodel import Session, select
+
+from app.database import create_db_engine
+from app.models import Task
+from app.utils.due_state import refresh_due_state
+from app.utils.queue import compact_assignment_queues
+from app.utils.stats import catch_up_stats
+
+
+# Schema-Migrationen über PRAGMA user_version.
+# Die Version in der DB-Datei ist die Anzahl der bereits angewendeten Einträge aus MIGRATIONS;
+# beim Start wird nur ausgeführt, was fehlt. Ist die DB aktuell, kostet das genau eine PRAGMA-Abfrage.
+# Jeder Schritt steht als festes SQL hier und hängt nicht vom aktuellen Stand der Models ab:
+# eine alte Datei durchläuft in jeder Version des Codes dieselben Schritte.
+# Jede Migration muss idempotent sein: DDL läuft in SQLite hier außerhalb einer Transaktion, und
+# Datenbanken aus der Zeit vor dem Runner (user_version 0) haben Teile des Schemas schon.
+# Datenmigrationen laden nur Spalten, die es in ihrem Schritt schon gibt.
+# Neue Migrationen nur hinten anhängen, nie umsortieren; Models und Migrationen müssen dasselbe
+# Schema ergeben (s. tests/test_migrations.py).
+MIGRATION_BATCH_SIZE = int(os.getenv("PUTZPLAN_MIGRATION_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+
+
+def _set_schema_version(conn: Connection, version: int):
+    # PRAGMA kennt keine Parameter-Bindung
+    conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def _existing_columns(conn: Connection, table_name: str) -> Set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table_name}")')}
+
+
+def _execute(db_engine: Engine, statements: Sequence[str]):
+    with db_engine.begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+
+def _add_columns(db_engine: Engine, columns: Sequence[Tuple[str, str, str]]):
+    """(Tabelle, Spalte, Spaltendefinition); vorhandene Spalten werden übersprungen."""
+    with db_engine.begin() as conn:
+        for table_name, column_name, definition in columns:
+            if column_name not in _existing_columns(conn, table_name):
+                conn.exec_driver_sql(f'ALTER TABLE "{table_name}" ADD COLUMN "{column_name}" {definition}')
+                logger.info("Spalte %s.%s ergänzt", table_name, column_name)
+
+
+# --- Migrationen ---
+
+# 1: Basisschema (Stand vor dem Runner) plus die Tabellen für Credits und Statistik
+_SCHEMA_1 = (
+    """CREATE TABLE IF NOT EXISTS user (
+        id INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        active BOOLEAN NOT NULL,
+        points INTEGER NOT NULL,
+        profile_image_url VARCHAR,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS task (
+        id INTEGER NOT NULL,
+        title VARCHAR NOT NULL,
+        description VARCHAR,
+        created_at DATETIME NOT NULL,
+        due_date DATETIME,
+        is_done BOOLEAN NOT NULL,
+        iteration INTEGER NOT NULL,
+        default_duration_days INTEGER NOT NULL,
+        credits INTEGER NOT NULL,
+        task_type VARCHAR(8) NOT NULL,
+        escalation_level INTEGER NOT NULL,
+        duration_modifier INTEGER NOT NULL,
+        last_completed_at DATETIME,
+        last_done_by INTEGER,
+        before_last_done_by INTEGER,
+        times_completed INTEGER NOT NULL,
+        remaining_days INTEGER NOT NULL,
+        blacklist JSON,
+        user_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(last_done_by) REFERENCES user (id),
+        FOREIGN KEY(before_last_done_by) REFERENCES user (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS tasklog (
+        id INTEGER NOT NULL,
+        task_id INTEGER NOT NULL,
+        user_id INTEGER,
+        user_name VARCHAR,
+        action VARCHAR NOT NULL,
+        timestamp DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(task_id) REFERENCES task (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS assignmentqueue (
+        id INTEGER NOT NULL,
+        task_id INTEGER NOT NULL,
+        user_queue JSON,
+        PRIMARY KEY (id),
+        FOREIGN KEY(task_id) REFERENCES task (id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_assignmentqueue_task_id ON assignmentqueue (task_id)",
+    """CREATE TABLE IF NOT EXISTS taskversion (
+        id INTEGER NOT NULL,
+        task_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        user_id INTEGER,
+        user_name VARCHAR,
+        action VARCHAR NOT NULL,
+        timestamp DATETIME NOT NULL,
+        data JSON NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(task_id) REFERENCES task (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS creditledger (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        task_id INTEGER,
+        task_version INTEGER,
+        credits INTEGER NOT NULL,
+        reason VARCHAR NOT NULL,
+        reverses_id INTEGER,
+        timestamp DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id),
+        FOREIGN KEY(task_id) REFERENCES task (id),
+        FOREIGN KEY(reverses_id) REFERENCES creditledger (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_creditledger_user_id ON creditledger (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_creditledger_task_id ON creditledger (task_id)",
+    "CREATE INDEX IF NOT EXISTS ix_creditledger_reverses_id ON creditledger (reverses_id)",
+    "CREATE INDEX IF NOT EXISTS ix_creditledger_timestamp ON creditledger (timestamp)",
+    """CREATE TABLE IF NOT EXISTS usercreditperiod (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        period VARCHAR NOT NULL,
+        credits INTEGER NOT NULL,
+        completions INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (user_id, period),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_usercreditperiod_user_id ON usercreditperiod (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_usercreditperiod_period ON usercreditperiod (period)",
+    """CREATE TABLE IF NOT EXISTS taskdailystats (
+        id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        task_id INTEGER NOT NULL,
+        completions INTEGER NOT NULL,
+        late_completions INTEGER NOT NULL,
+        lateness_days_total INTEGER NOT NULL,
+        escalations INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (day, task_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_taskdailystats_day ON taskdailystats (day)",
+    "CREATE INDEX IF NOT EXISTS ix_taskdailystats_task_id ON taskdailystats (task_id)",
+    """CREATE TABLE IF NOT EXISTS userdailystats (
+        id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        user_id INTEGER NOT NULL,
+        completions INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (day, user_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_userdailystats_day ON userdailystats (day)",
+    "CREATE INDEX IF NOT EXISTS ix_userdailystats_user_id ON userdailystats (user_id)",
+)
+
+# 2: Spalten, die create_all alten Dateien nie nachgetragen hat. Die ersten stammen aus der Zeit
+# vor dem Basisschema; NOT NULL geht bei ADD COLUMN nur mit konstantem Default.
+_COLUMNS_2 = (
+    ("user", "profile_image_url", "VARCHAR"),
+    ("task", "escalation_level", "INTEGER NOT NULL DEFAULT 0"),
+    ("task", "duration_modifier", "INTEGER NOT NULL DEFAULT 0"),
+    ("task", "remaining_days", "INTEGER NOT NULL DEFAULT 0"),
+    ("tasklog", "user_name", "VARCHAR"),
+    ("task", "mode", "VARCHAR NOT NULL DEFAULT 'recurring'"),
+    ("task", "due_at", "DATETIME"),
+    ("assignmentqueue", "cursor", "INTEGER NOT NULL DEFAULT 0"),
+    ("taskversion", "is_keyframe", "BOOLEAN NOT NULL DEFAULT 1"),
+    ("tasklog", "event", "VARCHAR"),
+    ("tasklog", "target_user_id", "INTEGER"),
+    ("tasklog", "value", "INTEGER"),
+    ("tasklog", "aggregated", "BOOLEAN NOT NULL DEFAULT 0"),
+)
+
+# 3: Indizes auf Spalten bestehender Tabellen
+_INDEXES_3 = (
+    "CREATE INDEX IF NOT EXISTS ix_task_due_at ON task (due_at)",
+    "CREATE INDEX IF NOT EXISTS ix_tasklog_task_id ON tasklog (task_id)",
+    "CREATE INDEX IF NOT EXISTS ix_tasklog_user_id ON tasklog (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_tasklog_action ON tasklog (action)",
+    "CREATE INDEX IF NOT EXISTS ix_tasklog_timestamp ON tasklog (timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_tasklog_event ON tasklog (event)",
+    "CREATE INDEX IF NOT EXISTS ix_tasklog_aggregated ON tasklog (aggregated)",
+)
+
+
+def _create_tables(db_engine: Engine):
+    _execute(db_engine, _SCHEMA_1)
+
+
+def _add_missing_columns(db_engine: Engine):
+    _add_columns(db_engine, _COLUMNS_2)
+
+
+def _create_indexes(db_engine: Engine):
+    _execute(db_engine, _INDEXES_3)
+
+
+def _compact_queues(db_engine: Engine):
+    # Alte 100er-Queues auf echte User eindampfen, Cursor setzen
+    with Session(db_engine) as session:
+        if compact_assignment_queues(session):
+            session.commit()
+
+
+def _backfill_due_state(db_engine: Engine):
+    # due_at/remaining_days für alle Tasks nachrechnen; Commit pro Batch hält den Schreib-Lock kurz
+    last_id = 0
+    while True:
+        with Session(db_engine) as session:
+            tasks = session.exec(
+                select(Task)
+                .options(load_only(
+                    Task.id, Task.mode, Task.due_date, Task.created_at, Task.last_completed_at,
+                    Task.default_duration_days, Task.duration_modifier, Task.due_at, Task.remaining_days,
+                ))
+                .where(Task.id > last_id)
+                .order_by(Task.id)
+                .limit(MIGRATION_BATCH_SIZE)
+            ).all()
+            if not tasks:
+                return
+            last_id = tasks[-1].id
+            for task in tasks:
+                refresh_due_state(task)
+                session.add(task)
+            session.commit()
+
+
+def _backfill_stats(db_engine: Engine):
+    # Alte Logs strukturieren (event/target_user_id) und in die Tages-Rollups einrechnen
+    while True:
+        with Session(db_engine) as session:
+            processed = catch_up_stats(session, batch_size=MIGRATION_BATCH_SIZE, limit=MIGRATION_BATCH_SIZE)
+            session.commit()
+        if processed < MIGRATION_BATCH_SIZE:
+            return
+
+
+def _add_undo_pointer(db_engine: Engine):
+    _add_columns(db_engine, (("task", "undo_pointer", "INTEGER"),))
+
+
+def _index_task_versions(db_engine: Engine):
+    _execute(db_engine, ("CREATE INDEX IF NOT EXISTS ix_taskversion_task_id_version ON taskversion (task_id, version)",))
+
+
+def _add_log_versions(db_engine: Engine):
+    _add_columns(db_engine, (
+        ("tasklog", "task_version", "INTEGER"),
+        ("tasklog", "reverted", "BOOLEAN NOT NULL DEFAULT 0"),
+    ))
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Engine], None]]] = [
+    ("Tabellen anlegen", _create_tables),
+    ("fehlende Spalten ergänzen", _add_missing_columns),
+    ("fehlende Indizes anlegen", _create_indexes),
+    ("Queues eindampfen", _compact_queues),
+    ("due_at/remaining_days nachrechnen", _backfill_due_state),
+    ("Logs in Tages-Rollups einrechnen", _backfill_stats),
+    ("Task.undo_pointer ergänzen", _add_undo_pointer),
+    ("Index TaskVersion(task_id, version)", _index_task_versions),
+    ("TaskLog.task_version/reverted ergänzen", _add_log_versions),
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def run_migrations(db_engine: Engine) -> int:
+    """
+    Bringt die DB auf SCHEMA_VERSION und gibt die Anzahl angewendeter Migrationen zurück.
+    Nach jeder Migration wird user_version hochgezählt: bricht ein Lauf ab, geht es beim
+    nächsten Start bei der fehlgeschlagenen weiter.
+    """
+    with db_engine.connect() as conn:
+        version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            logger.warning("Datenbank hat Schema %d, diese Version kennt nur %d", version, SCHEMA_VERSION)
+        return 0
+
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        description, migration = MIGRATIONS[number - 1]
+        started = time.perf_counter()
+        migration(db_engine)
+        with db_engine.begin() as conn:
+            _set_schema_version(conn, number)
+        logger.info("Migration %d (%s) in %.0f ms", number, description, (time.perf_counter() - started) * 1000)
+    return SCHEMA_VERSION - version
+
+
+def migrate_database_file(path: str) -> str:
+    """
+    Migriert eine einzelne DB-Datei (z.B. einen Upload vor dem Tausch).
+    Gibt eine Fehlermeldung zurück oder "" wenn alles passt, wie check_database_file.
+    """
+    db_engine = create_db_engine(f"sqlite:///{path}", pool_size=1)
+    try:
+        with db_engine.connect() as conn:
+            version = get_schema_version(conn)
+        if version > SCHEMA_VERSION:
+            return f"Datenbank stammt aus einer neueren Version (Schema {version}, unterstützt bis {SCHEMA_VERSION})"
+        run_migrations(db_engine)
+    except Exception as e:
+        logger.exception("Migration von %s fehlgeschlagen", path)
+        return f"Migration fehlgeschlagen: {e}"
+    finally:
+        # letzte Connection zu -> WAL wird eingecheckt, die Datei ist danach vollständig
+        db_engine.dispose()
+    return ""
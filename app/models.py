@@ -1,10 +1,10 @@
 from sqlmodel import SQLModel, Field, Session
 from typing import Any, Dict, Optional
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from sqlmodel import SQLModel, Field
 from typing import Optional, List
-from sqlalchemy import Column, select
+from sqlalchemy import Column, Index, UniqueConstraint, select
 from sqlmodel import JSON
 from app.enums import TaskType
 
@@ -33,6 +33,7 @@ class Task(SQLModel, table=True):
     default_duration_days: int = 7
     credits: int = 1
     task_type: TaskType = TaskType.free
+    mode: str = "recurring"  # "recurring" oder "one_time"
     escalation_level: int = 0  # default 0, kann erhöht werden
     duration_modifier: int = 0  # NEU
 
@@ -41,6 +42,8 @@ class Task(SQLModel, table=True):
     before_last_done_by: Optional[int] = Field(default=None, foreign_key="user.id")
     times_completed: int = 0
     remaining_days : int = 0
+    due_at: Optional[datetime] = Field(default=None, index=True)  # gespeicherte Fälligkeit, s. compute_due_at
+    undo_pointer: Optional[int] = None  # nach Undo/Redo: Version, deren Stand gerade aktiv ist; None = neuester Stand
 
     blacklist: Optional[List[int]] = Field(default_factory=list, sa_column=Column(JSON))
 
@@ -72,20 +75,30 @@ class Task(SQLModel, table=True):
 
 class TaskLog(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    task_id: int = Field(foreign_key="task.id")
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    task_id: int = Field(foreign_key="task.id", index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
     user_name: Optional[str] = None  # 👈 NEU
-    action: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    action: str = Field(index=True)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # Strukturierte Form von action (s. app/utils/stats.py), z.B. "assigned_to_5" -> event="assigned", target_user_id=5
+    event: Optional[str] = Field(default=None, index=True)
+    target_user_id: Optional[int] = None
+    value: Optional[int] = None  # bei "done": Verspätung in Tagen
+    aggregated: bool = Field(default=False, index=True)  # schon in die Tages-Rollups eingerechnet
+    task_version: Optional[int] = None  # Version der Änderung, zu der der Eintrag gehört (Undo/Redo der Rollups)
+    reverted: bool = False  # per Undo aus den Rollups herausgerechnet
 
 
 class AssignmentQueue(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     task_id: int = Field(foreign_key="task.id", unique=True, index=True)
-    user_queue: List[int] = Field(default_factory=list, sa_column=Column(JSON))  # ✅ Neu!
+    user_queue: List[int] = Field(default_factory=list, sa_column=Column(JSON))  # nur echte User-IDs
+    cursor: int = 0  # Position des aktuell zugewiesenen Users in user_queue
 
 
 class TaskVersion(SQLModel, table=True):
+    # Undo/Redo und Rekonstruktion suchen immer per (task_id, version)
+    __table_args__ = (Index("ix_taskversion_task_id_version", "task_id", "version"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     task_id: int = Field(foreign_key="task.id")
     version: int
@@ -93,4 +106,48 @@ class TaskVersion(SQLModel, table=True):
     user_name: Optional[str] = None
     action: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)  # ✅ korrekt!
+    is_keyframe: bool = True  # False: data enthält nur die geänderten Felder ggü. der Vorversion
     data: Dict[str, Any] = Field(default_factory=dict, sa_type=JSON)
+
+
+class CreditLedger(SQLModel, table=True):
+    # Append-only: Korrekturen (z.B. Undo) sind neue Zeilen mit negativen Credits
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    task_id: Optional[int] = Field(default=None, foreign_key="task.id", index=True)
+    task_version: Optional[int] = None  # TaskVersion-Snapshot vor der Erledigung, für Undo
+    credits: int
+    reason: str  # "task_done", "undo", "redo" oder "discarded" (Undo, das kein Redo mehr werden kann)
+    reverses_id: Optional[int] = Field(default=None, foreign_key="creditledger.id", index=True)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class UserCreditPeriod(SQLModel, table=True):
+    # Inkrementell gepflegte Summen pro User und Zeitraum ("2026-10" = Monat, "2026-W42" = ISO-Woche)
+    __table_args__ = (UniqueConstraint("user_id", "period"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    period: str = Field(index=True)
+    credits: int = 0
+    completions: int = 0
+
+
+class TaskDailyStats(SQLModel, table=True):
+    # Tages-Rollup pro Task, inkrementell aus TaskLog gepflegt
+    __table_args__ = (UniqueConstraint("day", "task_id"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    day: date = Field(index=True)
+    task_id: int = Field(index=True)
+    completions: int = 0
+    late_completions: int = 0
+    lateness_days_total: int = 0
+    escalations: int = 0
+
+
+class UserDailyStats(SQLModel, table=True):
+    # Tages-Rollup pro User
+    __table_args__ = (UniqueConstraint("day", "user_id"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    day: date = Field(index=True)
+    user_id: int = Field(index=True)
+    completions: int = 0
@@ -1,35 +1,69 @@
 from fastapi import APIRouter, Response, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import os
-import shutil
 
-router = APIRouter()
+from app.database import current_db_path, get_engine
+from app.migrations import migrate_database_file
+from app.utils.backup import (
+    check_database_file,
+    iter_file,
+    remove_quietly,
+    restore_database,
+    snapshot_database,
+    temp_path_next_to,
+    write_upload,
+)
+from app.utils.events import publish_event
+from app.utils.tenants import current_tenant
+from app.utils.user_index import invalidate_user_index
 
+router = APIRouter()
 
-DB_FILE_PATH = "putzplan.db"  # ggf. anpassen auf ./data/putzplan.db oder absoluter Pfad
+# DB-Pfad kommt aus current_db_path(): PUTZPLAN_DB_PATH bzw. die Datei des aktuellen Tenants
 
 
 @router.get("/export")
-def export_db():
-    """Ermöglicht den Download der aktuellen SQLite-Datenbank."""
-    if os.path.exists(DB_FILE_PATH):
-        return FileResponse(
-            path=DB_FILE_PATH,
-            filename="putzplan_backup.db",
-            media_type="application/octet-stream"
-        )
-    raise HTTPException(status_code=404, detail="Database file not found")
+def export_db(gzip: bool = False):
+    """
+    Ermöglicht den Download der aktuellen SQLite-Datenbank.
+    Es wird ein konsistenter Snapshot gestreamt (nie die live beschriebene Datei), optional gzip-komprimiert.
+    """
+    db_path = current_db_path()
+    if not os.path.exists(db_path):
+        raise HTTPException(status_code=404, detail="Database file not found")
+
+    snapshot_path = temp_path_next_to(db_path, ".snapshot")
+    try:
+        snapshot_database(get_engine(), snapshot_path)
+    except Exception:
+        remove_quietly(snapshot_path)
+        raise
+
+    tenant = current_tenant.get()
+    basename = f"putzplan_{tenant}_backup.db" if tenant else "putzplan_backup.db"
+    filename = f"{basename}.gz" if gzip else basename
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if not gzip:
+        headers["Content-Length"] = str(os.path.getsize(snapshot_path))
+    return StreamingResponse(
+        iter_file(snapshot_path, compress=gzip, delete=True),
+        media_type="application/gzip" if gzip else "application/octet-stream",
+        headers=headers,
+    )
 
 
 @router.post("/import")
-def import_db(
+async def import_db(
     file: UploadFile = File(...),
     confirm_1: bool = False,
     confirm_2: bool = False
 ):
     """
-    Importiert eine neue SQLite-Datenbankdatei.
+    Importiert eine neue SQLite-Datenbankdatei (roh oder gzip).
     Es muss zweimal bestätigt werden, um versehentliches Überschreiben zu vermeiden.
+    Die Datei wird geprüft, auf das aktuelle Schema migriert und dann in einer Transaktion in die laufende DB
+    eingespielt; ein Neustart ist nicht nötig.
     """
     if not (confirm_1 and confirm_2):
         raise HTTPException(
@@ -37,14 +71,22 @@ def import_db(
             detail="Import abgebrochen. Du musst zweimal bestätigen (confirm_1=true & confirm_2=true)."
         )
 
-    backup_path = f"{DB_FILE_PATH}.backup"
-
-    # Sicherung der alten Datei
-    if os.path.exists(DB_FILE_PATH):
-        shutil.copy(DB_FILE_PATH, backup_path)
+    db_path = current_db_path()
+    upload_path = temp_path_next_to(db_path, ".upload")
+    try:
+        await run_in_threadpool(write_upload, file.file, upload_path)
+        error = await run_in_threadpool(check_database_file, upload_path)
+        if not error:
+            # Ältere Backups vor dem Tausch auf das aktuelle Schema bringen: scheitert das, bleibt die alte DB aktiv
+            error = await run_in_threadpool(migrate_database_file, upload_path)
+        if error:
+            raise HTTPException(status_code=400, detail=f"Import abgebrochen. {error}")
 
-    # Neue Datei speichern
-    with open(DB_FILE_PATH, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+        # Vorher sichern und einspielen, beides unter einem Schreib-Lock der laufenden DB
+        await run_in_threadpool(restore_database, get_engine(), upload_path, f"{db_path}.backup")
+    finally:
+        remove_quietly(upload_path)
 
+    invalidate_user_index()
+    publish_event("reset", "db_imported")
     return {"message": "Neue Datenbank importiert. Alte Version gesichert als .backup"}
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlmodel import Session, select
+
+from app.database import get_session
+from app.models import CreditLedger, User, UserCreditPeriod
+from app.utils.credits import build_leaderboard, month_period, week_period
+from app.utils.etag import current_etag, is_not_modified, not_modified_response, set_etag
+
+router = APIRouter()
+
+MAX_LEDGER_LIMIT = 1000
+
+
+@router.get("/leaderboard")
+def get_leaderboard(
+    request: Request,
+    response: Response,
+    period: Literal["all", "month", "week"] = "all",
+    session: Session = Depends(get_session),
+):
+    """
+    Rangliste nach Credits. Liest nur die gepflegten Summen (User.points bzw. UserCreditPeriod),
+    nie die Historie: O(User).
+    """
+    now = datetime.utcnow()
+    period_key = {"all": None, "month": month_period(now), "week": week_period(now)}[period]
+    etag = current_etag(f"{period}-{period_key}")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    users = session.exec(select(User)).all()
+    rollups = None
+    if period_key is not None:
+        rows = session.exec(select(UserCreditPeriod).where(UserCreditPeriod.period == period_key)).all()
+        rollups = {row.user_id: row for row in rows}
+
+    return {"period": period, "period_key": period_key, "entries": build_leaderboard(users, rollups)}
+
+
+@router.get("/ledger", response_model=List[CreditLedger])
+def list_ledger(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_LEDGER_LIMIT),
+    before: Optional[int] = None,
+    user_id: Optional[int] = None,
+    task_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    """Buchungen, neueste zuerst. Weiterblättern wie bei /api/logs über X-Next-Before."""
+    stmt = select(CreditLedger).order_by(CreditLedger.id.desc())
+    if before is not None:
+        stmt = stmt.where(CreditLedger.id < before)
+    if user_id is not None:
+        stmt = stmt.where(CreditLedger.user_id == user_id)
+    if task_id is not None:
+        stmt = stmt.where(CreditLedger.task_id == task_id)
+
+    entries = session.exec(stmt.limit(limit + 1)).all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        response.headers["X-Next-Before"] = str(entries[-1].id)
+    return entries
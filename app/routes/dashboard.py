@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Request, Response
+from sqlmodel import Session, select
+
+from app.database import get_session
+from app.models import Task, User, AssignmentQueue
+from app.schemas import UserRead
+from app.routes.tasks import apply_task_filters
+from app.utils.due_state import build_task_read
+from app.utils.credits import rotation_credits
+from app.utils.queue import resolve_next_user_id
+from app.utils.etag import current_etag, is_not_modified, not_modified_response, set_etag
+
+router = APIRouter()
+
+QUEUE_PREVIEW_LENGTH = 10
+
+
+@router.get("")
+def get_dashboard(
+    request: Request,
+    response: Response,
+    urgency: Optional[Literal["green", "yellow", "red"]] = None,
+    due_within_days: Optional[int] = None,
+    user_id: Optional[int] = None,
+    sort: Optional[Literal["due"]] = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Alles, was index.html/user.html beim Laden brauchen, in einem Request:
+    User, Tasks (inkl. remaining_days/urgency_class), aktueller + nächster User und Queue-Vorschau.
+    Genau drei SQL-Queries (vier bei fairer Rotation), unabhängig von der Anzahl der Tasks.
+    Tasks lassen sich wie bei /api/tasks/ serverseitig filtern (z.B. ?user_id= für user.html).
+    """
+    etag = current_etag(datetime.utcnow().date().isoformat())
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    users = session.exec(select(User)).all()
+    tasks = session.exec(apply_task_filters(select(Task), urgency, due_within_days, user_id, sort)).all()
+    queues = session.exec(select(AssignmentQueue)).all()
+    credits = rotation_credits(session)  # None bei reiner Queue-Rotation, sonst eine Query mehr
+
+    active_user_ids = {u.id for u in users if u.active}
+    queue_by_task = {q.task_id: q for q in queues}
+
+    task_entries = []
+    for task in tasks:
+        queue = queue_by_task.get(task.id)
+        queue_list = (queue.user_queue or []) if queue else []
+        task_data = build_task_read(task)
+        task_data["current_user_id"] = task.user_id
+        task_data["next_user_id"] = resolve_next_user_id(task, queue_list, active_user_ids, queue.cursor if queue else None, credits)
+        task_data["queue_preview"] = queue_list[:QUEUE_PREVIEW_LENGTH]
+        task_entries.append(task_data)
+
+    return {
+        "users": [UserRead.model_validate(u) for u in users],
+        "tasks": task_entries,
+    }
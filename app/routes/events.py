@@ -0,0 +1,40 @@
+import asyncio
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.utils.events import subscribe, unsubscribe, format_sse
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+
+@router.get("")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events: schickt Task-/User-/Queue-Änderungen sobald sie passieren.
+    Ersetzt das Polling in index.html und user.html.
+    """
+    queue = subscribe()
+
+    async def event_stream():
+        try:
+            # Client soll nach Verbindungsabbruch nach 3s neu verbinden
+            yield "retry: 3000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
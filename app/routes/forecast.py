@@ -0,0 +1,47 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlmodel import Session, select
+
+from app.database import get_session
+from app.models import Task, User, AssignmentQueue
+from app.routes.tasks import is_assigned_task
+from app.utils.forecast import build_forecast, get_cached_forecast, store_forecast
+from app.utils.etag import current_etag, get_data_version, is_not_modified, not_modified_response, set_etag
+
+router = APIRouter()
+
+
+@router.get("")
+def get_forecast(
+    request: Request,
+    response: Response,
+    weeks: int = Query(4, ge=1, le=104),
+    include_schedule: bool = True,
+    session: Session = Depends(get_session),
+):
+    """
+    Vorschau der nächsten `weeks` Wochen: Termine und Zuständige pro Task
+    (Queue-Reihenfolge, Blacklist, aktive User) sowie erwartete Last/Credits pro User.
+    Ergebnis wird pro Datenversion + Tag gecacht, jeder Schreibzugriff invalidiert.
+    """
+    today = datetime.utcnow().date()
+    etag = current_etag(f"{today.isoformat()}-{weeks}-{int(include_schedule)}")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    # Version vor den Queries lesen: ein paralleler Schreibzugriff landet so unter einem neuen Key
+    cache_key = (get_data_version(), today, weeks, include_schedule)
+    result = get_cached_forecast(cache_key)
+    if result is None:
+        result = build_forecast(
+            session.exec(select(Task)).all(),
+            session.exec(select(AssignmentQueue)).all(),
+            session.exec(select(User)).all(),
+            is_assigned_task,
+            today,
+            weeks,
+            include_schedule,
+        )
+        store_forecast(cache_key, result)
+    return result
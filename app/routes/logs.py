@@ -1,17 +1,51 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from app.database import get_session
+from datetime import datetime
+from fastapi import APIRouter, Depends, Response
+from sqlmodel import select
+from app.database import get_read_session
 from app.models import TaskLog
 from typing import Optional
 
 
 router = APIRouter()
 
+MAX_LOG_LIMIT = 1000
+
 
 @router.get("/")
-def list_logs(limit: Optional[int] = 1000, session: Session = Depends(get_session)):
-    stmt = select(TaskLog).order_by(TaskLog.timestamp.desc())
-    if limit:
-        stmt = stmt.limit(limit)
-    return session.exec(stmt).all()
+async def list_logs(
+    response: Response,
+    limit: Optional[int] = MAX_LOG_LIMIT,
+    before: Optional[int] = None,
+    task_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db=Depends(get_read_session),
+):
+    """
+    Logs, neueste zuerst, seitenweise per Keyset (?before=<id>&limit=).
+    Gibt es ältere Einträge, steht der Cursor für die nächste Seite im Header X-Next-Before.
+    """
+    limit = min(max(limit or MAX_LOG_LIMIT, 1), MAX_LOG_LIMIT)
+
+    stmt = select(TaskLog).order_by(TaskLog.id.desc())
+    if before is not None:
+        stmt = stmt.where(TaskLog.id < before)
+    if task_id is not None:
+        stmt = stmt.where(TaskLog.task_id == task_id)
+    if user_id is not None:
+        stmt = stmt.where(TaskLog.user_id == user_id)
+    if action is not None:
+        stmt = stmt.where(TaskLog.action == action)
+    if since is not None:
+        stmt = stmt.where(TaskLog.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(TaskLog.timestamp < until)
 
+    # Einen mehr holen, um zu wissen, ob es eine nächste Seite gibt
+    logs = await db.all(stmt.limit(limit + 1))
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Before"] = str(logs[-1].id)
+    return logs
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import render_prometheus
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus-Scrape-Endpoint (Textformat 0.0.4)."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
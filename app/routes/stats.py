@@ -0,0 +1,30 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlmodel import Session
+
+from app.database import get_session
+from app.utils.stats import build_stats, stats_window
+from app.utils.etag import current_etag, is_not_modified, not_modified_response, set_etag
+
+router = APIRouter()
+
+
+@router.get("")
+def get_stats(
+    request: Request,
+    response: Response,
+    weeks: int = Query(12, ge=1, le=104),
+    session: Session = Depends(get_session),
+):
+    """
+    Erledigungen pro User und Woche, durchschnittliche Verspätung und Eskalationen pro Task
+    für die letzten `weeks` Wochen. Liest nur die Tages-Rollups, nie TaskLog.
+    """
+    today = datetime.utcnow().date()
+    etag = current_etag(f"{today.isoformat()}-{weeks}")
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    since, until = stats_window(weeks, today)
+    return build_stats(session, since, until)
@@ -1,139 +1,110 @@
-from http.client import HTTPException
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 
 from app.enums import TaskType
 from app.models import Task, AssignmentQueue, TaskVersion, User
-from app.schemas import TaskCreate, TaskRead, TaskUpdate
-from app.database import get_session
+from app.schemas import TaskBatchRequest, TaskCreate, TaskRead, TaskUpdate
+from app.database import get_session, get_read_session
 from app.utils.logging import auto_serialize, log_task_action, log_task_version_auto
-from typing import List, Optional
+from app.utils.events import publish_event
+from app.utils.etag import current_etag, get_data_version, is_not_modified, not_modified_response, set_etag
+from app.utils.serialization import TASK_ADAPTER, TASK_LIST_ADAPTER, dump_json, json_response, task_list_cache
+from typing import List, Literal, Optional, Tuple
+from sqlalchemy import and_, func, not_, or_
 from sqlalchemy.orm.attributes import flag_modified
-import random
 
+from app.utils.due_state import build_task_read, publish_task_event, refresh_due_state, remaining_days_sql
 from app.utils.undo import apply_task_version
+from app.utils.versions import (
+    VERSION_RETENTION,
+    compact_task_versions,
+    load_recent_versions,
+    materialize_versions,
+    reconstruct_task_data,
+    version_bounds,
+)
+from app.utils.credits import record_task_credit, restore_task_credits, reverse_task_credits, rotation_credits
+from app.utils.stats import restore_task_stats, reverse_task_stats
+from app.utils.user_index import get_active_user_ids, get_active_user_ids_async
+from app.utils.queue import get_queue, queue_query, new_queue, resolve_next_slot, resolve_next_user_id, shuffle_queue, sync_cursor
 
 
 
 router = APIRouter()
 
-def calculate_remaining_days(task: Task) -> int:
+def urgency_condition(urgency: str, today: date):
+    """SQL-Pendant zu calculate_urgency_class, damit die DB nach Dringlichkeit filtern kann."""
+    remaining = remaining_days_sql(today)
+    duration = func.coalesce(Task.default_duration_days, 0)
+    escalated = Task.escalation_level >= 1
+    red_by_time = and_(duration > 0, remaining * 100 < duration * 15)
+    yellow_by_time = and_(duration > 0, remaining * 100 >= duration * 15, remaining * 100 < duration * 40)
+
+    if urgency == "red":
+        return or_(escalated, red_by_time)
+    if urgency == "yellow":
+        return and_(not_(escalated), yellow_by_time)
+    return and_(not_(escalated), not_(red_by_time), not_(yellow_by_time))
+
+def apply_task_filters(stmt, urgency: Optional[str] = None, due_within_days: Optional[int] = None,
+                       user_id: Optional[int] = None, sort: Optional[str] = None):
     today = datetime.utcnow().date()
-
-    # 1️⃣ Einmalige Aufgaben: Abstand bis zum due_date
-    if task.mode == TaskType.one_time:
-        if task.due_date:
-            return max((task.due_date.date() - today).days, 0)
-        # ohne due_date kann man nichts rechnen
-        return 0
-    days_since_last_done = (datetime.utcnow().date() - task.last_completed_at.date()).days if task.last_completed_at else 0
-    return max(task.default_duration_days + task.duration_modifier - days_since_last_done, 0)
-
-def calculate_urgency_class(task: Task, remaining_days: int) -> str:
-    # Immer rot, wenn Eskalation aktiv ist
-    if task.escalation_level >= 1:
-        return 'red'
-
-    # Wenn keine Dauer definiert ist (zur Sicherheit)
-    if not task.default_duration_days or task.default_duration_days == 0:
-        return 'green'  # fallback: keine Info = unkritisch
-
-    # Berechne den Prozentsatz
-    percentage_left = (remaining_days / task.default_duration_days) * 100
-
-    if percentage_left < 15:
-        return 'red'
-    elif percentage_left < 40:
-        return 'yellow'
-    else:
-        return 'green'
+    if urgency is not None:
+        stmt = stmt.where(urgency_condition(urgency, today))
+    if due_within_days is not None:
+        # über den Index auf due_at: alles, was bis Ende des n-ten Tages fällig ist
+        stmt = stmt.where(Task.due_at < datetime.combine(today + timedelta(days=due_within_days + 1), time.min))
+    if user_id is not None:
+        stmt = stmt.where(Task.user_id == user_id)
+    if sort == "due":
+        stmt = stmt.order_by(Task.due_at.is_(None), Task.due_at)
+    return stmt
 
 def get_next_active_user(task: Task, session: Session) -> Optional[User]:
-    queue = session.exec(select(AssignmentQueue).where(AssignmentQueue.task_id == task.id)).first()
+    queue = get_queue(session, task.id)
     if not queue or not queue.user_queue:
         return None
 
-    queue_list = queue.user_queue
-    current_user_id = task.user_id
-
-    try:
-        current_index = queue_list.index(current_user_id)
-    except ValueError:
-        return None  # Aktueller User nicht in der Queue
-
-    for offset in range(1, len(queue_list) + 1):
-        next_index = (current_index + offset) % len(queue_list)
-        next_user_id = queue_list[next_index]
-        potential_user = session.get(User, next_user_id)
-
-        if (potential_user and potential_user.active and
-            not task.is_user_blacklisted(next_user_id)):
-            return potential_user
-
-    return None
-
-
-# --- Routen ---
-@router.post("/", response_model=TaskRead)
-def create_task(task_data: TaskCreate, session: Session = Depends(get_session)):
-    task = Task(**task_data.dict())
-    session.add(task)
-    session.commit()
-    session.refresh(task)
+    # Aktive User kommen aus dem In-Process-Index, die Auflösung selbst ist rein in-memory
+    next_user_id = resolve_next_user_id(task, queue.user_queue, get_active_user_ids(session), queue.cursor, rotation_credits(session))
+    return session.get(User, next_user_id) if next_user_id is not None else None
 
-    #Queue erstellen mit 100 Einträgen egal ob aktiv oder nicht 
-    # Erzeuge eine Liste von 1 bis 100
-    user_ids = list(range(1, 101))
-    random.shuffle(user_ids)
+def advance_assignment_queue(task: Task, session: Session) -> Optional[User]:
+    """Wie get_next_active_user, rückt aber zusätzlich den Cursor der Queue weiter."""
+    queue = get_queue(session, task.id)
+    if not queue or not queue.user_queue:
+        return None
 
-    queue_list = user_ids  # genau 100 IDs, alle einmal, randomisiert
+    slot = resolve_next_slot(task, queue.user_queue, get_active_user_ids(session), queue.cursor, rotation_credits(session))
+    if slot is None:
+        return None
 
-    queue = AssignmentQueue(task_id=task.id, user_queue=queue_list)
+    queue.cursor = slot
     session.add(queue)
-    session.commit()
+    return session.get(User, queue.user_queue[slot])
 
-    log_task_action(session, task.id, action="created", user_id=None)
 
+def is_assigned_task(task: Task) -> bool:
+    # aus der DB kommt das Enum, über TaskUpdate kann noch der Name als String gesetzt sein
+    return task.task_type in (TaskType.assigned, TaskType.assigned.name)
 
-    remaining_days = calculate_remaining_days(task)
-    urgency_class = calculate_urgency_class(task, remaining_days)
-    task_data = task.dict()
-    task_data["remaining_days"] = remaining_days
-    task_data["urgency_class"] = urgency_class
 
-    return task_data
-
-
-@router.get("/", response_model=List[TaskRead])
-def list_tasks(session: Session = Depends(get_session)):
-    tasks = session.exec(select(Task)).all()
-
-    tasks_with_remaining = []
-    for task in tasks:
-        remaining_days = calculate_remaining_days(task)
-        urgency_class = calculate_urgency_class(task, remaining_days)
-        task_data = task.dict()
-        task_data["remaining_days"] = remaining_days
-        task_data["urgency_class"] = urgency_class
-        tasks_with_remaining.append(task_data)
-
-    return tasks_with_remaining
-
-
-@router.patch("/{task_id}/done", response_model=TaskRead)
-def mark_done(task_id: int, session: Session = Depends(get_session)):
-    task = session.get(Task, task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    log_task_version_auto(task, session, action="mark_done", user_id=task.user_id)
+# --- Änderungen (ohne Commit), genutzt von den Einzelrouten und /batch ---
+def apply_mark_done(task: Task, session: Session):
+    # Verspätung gegenüber der bisherigen Fälligkeit, für die Statistik
+    today = datetime.utcnow().date()
+    lateness_days = max((today - task.due_at.date()).days, 0) if task.due_at else 0
 
     # Update task properties
     task.last_completed_at = datetime.utcnow()
     task.last_done_by = task.user_id
     task.times_completed += 1
 
+    # Credits gutschreiben (vor der Rotation, solange user_id noch der Erlediger ist)
+    if task.user_id is not None:
+        record_task_credit(session, task.user_id, task.id, task.credits, task.iteration)
+
     if task.mode == "recurring":
         task.due_date = datetime.utcnow() + timedelta(days=task.default_duration_days)
     elif task.mode == "one_time":
@@ -142,33 +113,186 @@ def mark_done(task_id: int, session: Session = Depends(get_session)):
     # Reset Flags
     task.escalation_level = 0
     task.duration_modifier = 0
+    refresh_due_state(task)
 
     # Assign next user for 'assigned' tasks
-    if task.task_type == "assigned":
+    if is_assigned_task(task):
         if task.user_id is None:
             log_task_action(session, task.id, action="no_current_user_set_cannot_assign_next", user_id=None)
         else:
-            next_user = get_next_active_user(task, session)
+            next_user = advance_assignment_queue(task, session)
             if next_user:
                 task.user_id = next_user.id
                 log_task_action(session, task.id, action=f"assigned_to_{next_user.id}", user_id=None)
             else:
                 log_task_action(session, task.id, action="no_next_active_user_found", user_id=None)
 
-    log_task_action(session, task.id, action="done", user_id=None)
+    log_task_action(session, task.id, action="done", user_id=task.last_done_by, value=lateness_days, task_version=task.iteration)
+    session.add(task)
+
+def apply_assign(task: Task, user_id: int, session: Session):
+    task.user_id = user_id
+    session.add(task)
+
+    queue = get_queue(session, task.id)
+    if queue:
+        sync_cursor(queue, user_id)
+        session.add(queue)
+
+    log_task_action(session, task.id, action=f"assigned_to_{user_id}", user_id=None)
+
+def apply_blacklist(task: Task, user_id: int, add: bool, session: Session):
+    if add:
+        task.add_to_blacklist(user_id)
+    else:
+        task.remove_from_blacklist(user_id)
+    flag_modified(task, "blacklist")
+    session.add(task)
+    log_task_action(session, task.id, action=f"blacklist_{'added' if add else 'removed'}_{user_id}", user_id=None)
+
+def apply_update(task: Task, update_data: dict, session: Session):
+    for key, value in update_data.items():
+        setattr(task, key, value)
+    # Dauer oder Modus können sich geändert haben
+    refresh_due_state(task)
+
     session.add(task)
+    log_task_action(session, task.id, action="updated", user_id=None)
+
+def apply_shuffle(task: Task, session: Session) -> AssignmentQueue:
+    queue = get_queue(session, task.id)
+
+    if queue:
+        # Nur die echten Mitglieder neu würfeln
+        shuffle_queue(queue, task.user_id)
+        flag_modified(queue, "user_queue")
+    else:
+        queue = new_queue(task, session.exec(select(User.id)).all())
+    session.add(queue)
+
+    log_task_action(session, task.id, action="queue_shuffled", user_id=None)
+    return queue
+
+
+# --- Routen ---
+@router.post("/", response_model=TaskRead)
+def create_task(task_data: TaskCreate, session: Session = Depends(get_session)):
+    task = Task(**task_data.dict())
+    refresh_due_state(task)
+    session.add(task)
+    session.flush()  # nur für task.id, Commit erst am Ende
+
+    # Queue nur mit den echten Usern (auch inaktive, die werden beim Rotieren übersprungen)
+    user_ids = session.exec(select(User.id)).all()
+    queue = new_queue(task, user_ids)
+    session.add(queue)
+
+    log_task_action(session, task.id, action="created", user_id=None)
+
     session.commit()
     session.refresh(task)
 
-    remaining_days = calculate_remaining_days(task)
-    urgency_class = calculate_urgency_class(task, remaining_days)
-    task_data = task.dict()
-    task_data["remaining_days"] = remaining_days
-    task_data["urgency_class"] = urgency_class
-
+    task_data = build_task_read(task)
+    publish_event("task", "created", task.id, task_data)
     return task_data
 
 
+@router.get("/", response_model=List[TaskRead])
+async def list_tasks(
+    request: Request,
+    response: Response,
+    urgency: Optional[Literal["green", "yellow", "red"]] = None,
+    due_within_days: Optional[int] = None,
+    user_id: Optional[int] = None,
+    sort: Optional[Literal["due"]] = None,
+    db=Depends(get_read_session),
+):
+    # Restlaufzeit hängt vom Datum ab -> Datum gehört mit ins ETag
+    today = datetime.utcnow().date()
+    etag = current_etag(today.isoformat())
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    # Version vor der Query lesen: ein paralleler Schreibzugriff landet so unter einem neuen Key
+    cache_key = (get_data_version(), today, urgency, due_within_days, user_id, sort)
+    body = task_list_cache.get(cache_key)
+    if body is None:
+        # Filtern/Sortieren macht die DB (gespeichertes due_at + Index)
+        tasks = await db.all(apply_task_filters(select(Task), urgency, due_within_days, user_id, sort))
+        body = dump_json(TASK_LIST_ADAPTER, [build_task_read(task) for task in tasks])
+        task_list_cache.put(cache_key, body)
+    return json_response(body, response)
+
+
+@router.post("/batch", response_model=List[TaskRead])
+def batch_tasks(batch: TaskBatchRequest, session: Session = Depends(get_session)):
+    """
+    Mehrere Operationen (mark_done, assign, blacklist_add/-remove, update, shuffle_queue)
+    in einer Transaktion. Pro betroffenem Task genau ein Versions-Snapshot.
+    Schlägt eine Operation fehl, wird nichts übernommen.
+    """
+    touched = {}
+    shuffled = set()
+
+    for index, operation in enumerate(batch.operations):
+        task = touched.get(operation.task_id) or session.get(Task, operation.task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail=f"Operation {index}: Task {operation.task_id} not found")
+
+        if operation.op in ("assign", "blacklist_add", "blacklist_remove") and operation.user_id is None:
+            raise HTTPException(status_code=400, detail=f"Operation {index}: user_id required for {operation.op}")
+        if operation.op == "update" and operation.fields is None:
+            raise HTTPException(status_code=400, detail=f"Operation {index}: fields required for update")
+
+        # Snapshot vor der ersten Änderung an diesem Task
+        if task.id not in touched:
+            log_task_version_auto(task, session, action="batch", user_id=task.user_id)
+            touched[task.id] = task
+
+        if operation.op == "mark_done":
+            apply_mark_done(task, session)
+        elif operation.op == "assign":
+            apply_assign(task, operation.user_id, session)
+        elif operation.op == "blacklist_add":
+            apply_blacklist(task, operation.user_id, True, session)
+        elif operation.op == "blacklist_remove":
+            apply_blacklist(task, operation.user_id, False, session)
+        elif operation.op == "update":
+            apply_update(task, operation.fields.dict(exclude_unset=True), session)
+        elif operation.op == "shuffle_queue":
+            apply_shuffle(task, session)
+            shuffled.add(task.id)
+
+    session.commit()
+
+    results = []
+    for task in touched.values():
+        session.refresh(task)
+        task_data = build_task_read(task)
+        publish_event("task", "batch", task.id, task_data)
+        results.append(task_data)
+    for task_id in shuffled:
+        publish_event("queue", "shuffled", task_id, {"task_id": task_id})
+    return results
+
+
+@router.patch("/{task_id}/done", response_model=TaskRead)
+def mark_done(task_id: int, session: Session = Depends(get_session)):
+    task = session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    log_task_version_auto(task, session, action="mark_done", user_id=task.user_id)
+    apply_mark_done(task, session)
+    session.commit()
+    session.refresh(task)
+
+    task_data = build_task_read(task)
+    publish_event("task", "mark_done", task.id, task_data)
+    return json_response(dump_json(TASK_ADAPTER, task_data))
+
+
 @router.patch("/{task_id}/reset")
 def reset_task(task_id: int, session: Session = Depends(get_session)):
     task = session.get(Task, task_id)
@@ -180,33 +304,39 @@ def reset_task(task_id: int, session: Session = Depends(get_session)):
     if task.mode == "one_time": 
         return {"error": "Cannot reset one-time tasks."}
 
-    elif task.mode == "recurring":
+    # Zustand vorher loggen: auch ein Reset ist undo-fähig und verwirft einen offenen Redo-Zweig
+    log_task_version_auto(task, session, action="reset", user_id=task.user_id)
+
+    if task.mode == "recurring":
         task.due_date = now + timedelta(days=task.default_duration_days)
         task.last_completed_at = now
         task.is_done = False  # optional, kannst du auch weglassen
 
+    refresh_due_state(task)
 
     log_task_action(session, task.id, action="reset", user_id=None)
 
     session.add(task)
     session.commit()
     session.refresh(task)
+    publish_task_event(task, "reset")
     return task
 
 
 @router.post("/{task_id}/vote-escalate")
 def vote_escalate(task_id: int, session: Session = Depends(get_session)):
     task = session.get(Task, task_id)
-    log_task_version_auto(task, session, action="vote_putzen", user_id=task.user_id)
-    if task:
-        task.escalation_level += 1
-        if task.escalation_level > 2:task.escalation_level=2
-        session.add(task)
-        log_task_action(session, task.id, action="escalated", user_id=None)
-        session.commit()
-        session.refresh(task)
-    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
 
+    log_task_version_auto(task, session, action="vote_putzen", user_id=task.user_id)
+    task.escalation_level += 1
+    if task.escalation_level > 2:task.escalation_level=2
+    session.add(task)
+    log_task_action(session, task.id, action="escalated", user_id=None, task_version=task.iteration)
+    session.commit()
+    session.refresh(task)
+    publish_task_event(task, "escalated")
 
     return task
 
@@ -226,11 +356,13 @@ def vote_urgency(task_id: int, direction: str, session: Session = Depends(get_se
         task.duration_modifier += 1
     else:
         raise HTTPException(status_code=400, detail="Invalid direction")
+    refresh_due_state(task)
 
     session.add(task)
-    session.commit()
-
     log_task_action(session, task.id, action=f"urgency_{direction}", user_id=None)
+    session.commit()
+    session.refresh(task)
+    publish_task_event(task, f"urgency_{direction}")
     return task
 
 
@@ -242,6 +374,7 @@ def delete_task(task_id: int, session: Session = Depends(get_session)):
         log_task_action(session, task.id, action="deleted", user_id=None)
         session.delete(task)
         session.commit()
+        publish_event("task", "deleted", task_id, None)
     return {"message": f"Task {task_id} gelöscht"}
 
 
@@ -255,22 +388,20 @@ def assign_task(task_id: int, user_id: int, session: Session = Depends(get_sessi
     log_task_version_auto(task, session, action="assign_user", user_id=task.user_id)
 
     # 🔧 Jetzt erst Änderung durchführen
-    task.user_id = user_id
-    session.add(task)
-
-    log_task_action(session, task.id, action=f"assigned_to_{user_id}", user_id=None)
+    apply_assign(task, user_id, session)
     session.commit()
     session.refresh(task)
+    publish_task_event(task, "assigned")
     return task
 
 
 @router.get("/queue/{task_id}")
-def get_assignment_queue(task_id: int, session: Session = Depends(get_session)):
-    queue = session.exec(select(AssignmentQueue).where(AssignmentQueue.task_id == task_id)).first()
+async def get_assignment_queue(task_id: int, db=Depends(get_read_session)):
+    queue = await db.first(queue_query(task_id))
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
 
-    return {"task_id": task_id, "slot_queue": queue.user_queue}
+    return {"task_id": task_id, "slot_queue": queue.user_queue, "cursor": queue.cursor}
 
 @router.patch("/queue/{task_id}/shuffle")
 def shuffle_assignment_queue(task_id: int, session: Session = Depends(get_session)):
@@ -278,34 +409,19 @@ def shuffle_assignment_queue(task_id: int, session: Session = Depends(get_sessio
     if not task:
         raise HTTPException(status_code=400, detail="Invalid task")
 
-    # IDs von 1 bis 100
-    user_ids = list(range(1, 101))
-    random.shuffle(user_ids)
-
-    queue = session.exec(
-        select(AssignmentQueue).where(AssignmentQueue.task_id == task_id)
-    ).first()
-
-    if queue:
-        queue.user_queue = user_ids  # ✅ neu!
-    else:
-        queue = AssignmentQueue(task_id=task_id, user_queue=user_ids)
-        session.add(queue)
-
+    queue = apply_shuffle(task, session)
     session.commit()
-
-    log_task_action(session, task.id, action="queue_shuffled", user_id=None)
-    return {"task_id": task_id, "new_queue": user_ids}
+    publish_event("queue", "shuffled", task_id, {"task_id": task_id})
+    return {"task_id": task_id, "new_queue": queue.user_queue}
 
 
 @router.get("/queue/{task_id}/active")
-def get_active_assignment_queue(task_id: int, session: Session = Depends(get_session)):
-    queue = session.exec(select(AssignmentQueue).where(AssignmentQueue.task_id == task_id)).first()
+async def get_active_assignment_queue(task_id: int, db=Depends(get_read_session)):
+    queue = await db.first(queue_query(task_id))
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
 
-    active_users = session.exec(select(User).where(User.active == True)).all()
-    active_user_ids = {u.id for u in active_users}
+    active_user_ids = await get_active_user_ids_async(db)
 
     filtered_queue = [user_id for user_id in queue.user_queue if user_id in active_user_ids]
 
@@ -317,15 +433,14 @@ def get_active_assignment_queue(task_id: int, session: Session = Depends(get_ses
 
 
 @router.get("/queue/{task_id}/active-filtered")
-def get_filtered_assignment_queue(task_id: int, session: Session = Depends(get_session)):
-    queue = session.exec(select(AssignmentQueue).where(AssignmentQueue.task_id == task_id)).first()
+async def get_filtered_assignment_queue(task_id: int, db=Depends(get_read_session)):
+    queue = await db.first(queue_query(task_id))
     if not queue:
         raise HTTPException(status_code=404, detail="Queue not found")
 
-    active_users = session.exec(select(User).where(User.active == True)).all()
-    active_user_ids = {u.id for u in active_users}
+    active_user_ids = await get_active_user_ids_async(db)
 
-    task = session.get(Task, task_id)
+    task = await db.get(Task, task_id)
     blacklist = task.blacklist or []
 
     filtered_queue = [
@@ -343,22 +458,17 @@ def get_filtered_assignment_queue(task_id: int, session: Session = Depends(get_s
 @router.patch("/{task_id}", response_model=TaskRead)
 def update_task(task_id: int, task_update: TaskUpdate, session: Session = Depends(get_session)):
     task = session.get(Task, task_id)
-    log_task_version_auto(task, session, action="update_task", user_id=task.user_id)
-
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    update_data = task_update.dict(exclude_unset=True)
-
-    for key, value in update_data.items():
-        setattr(task, key, value)
+    log_task_version_auto(task, session, action="update_task", user_id=task.user_id)
 
-    session.add(task)
+    apply_update(task, task_update.dict(exclude_unset=True), session)
     session.commit()
     session.refresh(task)
-
-    log_task_action(session, task.id, action="updated", user_id=None)
-    return task
+    task_data = build_task_read(task)
+    publish_event("task", "updated", task.id, task_data)
+    return task_data
 
 @router.post("/{task_id}/blacklist/{user_id}")
 def add_to_blacklist(task_id: int, user_id: int, session: Session = Depends(get_session)):
@@ -366,10 +476,11 @@ def add_to_blacklist(task_id: int, user_id: int, session: Session = Depends(get_
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    task.add_to_blacklist(user_id)
-    flag_modified(task, "blacklist") 
-    session.add(task)
+    log_task_version_auto(task, session, action="blacklist_add", user_id=task.user_id)
+    apply_blacklist(task, user_id, True, session)
     session.commit()
+    session.refresh(task)
+    publish_task_event(task, "blacklist_added")
     return {"message": f"User {user_id} added to blacklist"}
 
 
@@ -379,32 +490,89 @@ def remove_from_blacklist(task_id: int, user_id: int, session: Session = Depends
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    task.remove_from_blacklist(user_id)
-    flag_modified(task, "blacklist") 
-    session.add(task)
+    log_task_version_auto(task, session, action="blacklist_remove", user_id=task.user_id)
+    apply_blacklist(task, user_id, False, session)
     session.commit()
+    session.refresh(task)
+    publish_task_event(task, "blacklist_removed")
     return {"message": f"User {user_id} removed from blacklist"}
 
 
+def restore_task_version(task: Task, version: int, session: Session):
+    """Stand einer Version aktivieren; der Undo-Pointer merkt sich, welche das ist."""
+    # Versionen sind Deltas -> vollen Snapshot aus Keyframe + Deltas rekonstruieren
+    data = reconstruct_task_data(session, task.id, version)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"Version {version} not found")
+    apply_task_version(task, data, session)
+    task.iteration = version
+    task.undo_pointer = version
+    refresh_due_state(task)
+
+
 @router.post("/undo/{task_id}")
-def undo_task(task_id: int, session: Session = Depends(get_session)):
-    stmt = (
-        select(TaskVersion)
-        .where(TaskVersion.task_id == task_id)
-        .order_by(TaskVersion.version.desc())
-    )
-    latest_version = session.exec(stmt).first()
-
-    if not latest_version:
+def undo_task(task_id: int, steps: int = Query(1, ge=1), session: Session = Depends(get_session)):
+    """
+    Macht `steps` Änderungen auf einmal rückgängig: Version i enthält den Stand vor Änderung i,
+    Ziel ist also Pointer - steps. Ein Lookup der Versionsgrenzen, eine Rekonstruktion, ein Commit.
+    """
+    task = session.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    oldest, latest = version_bounds(session, task_id)
+    if latest is None:
         raise HTTPException(status_code=404, detail="No versions found to undo")
 
+    position = task.undo_pointer
+    if position is None:
+        # Der aktuelle Stand steht noch in keiner Version -> als Checkpoint sichern, damit Redo dorthin zurückfindet
+        log_task_version_auto(task, session, action="undo_checkpoint", user_id=task.user_id)
+        position = latest = task.iteration
+
+    target = position - steps
+    if target < oldest:
+        raise HTTPException(status_code=400, detail=f"Only {position - oldest} step(s) can be undone")
+
+    restore_task_version(task, target, session)
+    # Gutschriften der rückgängig gemachten Erledigungen stornieren
+    reverse_task_credits(session, task.id, target)
+    # ... und die Statistik-Rollups dieser Änderungen
+    reverse_task_stats(session, task.id, target)
+    log_task_action(session, task.id, action="undone", user_id=None)
+    session.commit()
+    session.refresh(task)
+    publish_task_event(task, "undone")
+
+    return {"message": "Task undone successfully", "version": target, "can_undo": target - oldest, "can_redo": latest - target}
+
+
+@router.post("/redo/{task_id}")
+def redo_task(task_id: int, steps: int = Query(1, ge=1), session: Session = Depends(get_session)):
+    """Gegenstück zu undo: Pointer um `steps` vorwärts, bis höchstens zum Stand vor dem ersten Undo."""
     task = session.get(Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    apply_task_version(task, latest_version, session)
+    position = task.undo_pointer
+    if position is None:
+        raise HTTPException(status_code=400, detail="Nothing to redo")
+
+    oldest, latest = version_bounds(session, task_id)
+    target = position + steps
+    if latest is None or target > latest:
+        raise HTTPException(status_code=400, detail=f"Only {max((latest or position) - position, 0)} step(s) can be redone")
 
-    return {"message": "Task undone successfully"}
+    restore_task_version(task, target, session)
+    # Stornos der wiederhergestellten Erledigungen aufheben
+    restore_task_credits(session, task.id, position, target)
+    restore_task_stats(session, task.id, position, target)
+    log_task_action(session, task.id, action="redone", user_id=None)
+    session.commit()
+    session.refresh(task)
+    publish_task_event(task, "redone")
+
+    return {"message": "Task redone successfully", "version": target, "can_undo": target - oldest, "can_redo": latest - target}
 
 
 @router.get("/tasks/versions/", response_model=List[TaskVersion])
@@ -412,16 +580,15 @@ def get_all_task_versions(session: Session = Depends(get_session)):
     # Query all task versions, ordered by task_id and version
     stmt = select(TaskVersion).order_by(TaskVersion.task_id, TaskVersion.version)
     task_versions = session.exec(stmt).all()
-    return task_versions
+    return materialize_versions(task_versions)
+
+@router.post("/versions/compact")
+def compact_versions(keep: int = VERSION_RETENTION, session: Session = Depends(get_session)):
+    """Retention-Job: ältere Versionen zusammenführen, pro Task nur die neuesten `keep` behalten."""
+    removed = compact_task_versions(session, keep)
+    session.commit()
+    return {"removed_versions": removed, "kept_per_task": keep}
 
 @router.get("/versions/{task_id}", response_model=List[TaskVersion])
 def get_recent_task_versions(task_id: int, session: Session = Depends(get_session)):
-    stmt = (
-        select(TaskVersion)
-        .where(TaskVersion.task_id == task_id)
-        .order_by(TaskVersion.timestamp.desc())
-        .limit(10)
-    )
-    versions = session.exec(stmt).all()
-    return versions
-
+    return load_recent_versions(session, task_id, limit=10)
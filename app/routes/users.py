@@ -1,24 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.routes.tasks import get_next_active_user
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session, select
-from app.database import get_session
-from app.models import User, Task, AssignmentQueue
+from app.database import get_session, get_read_session
+from app.models import User, Task
 from app.schemas import UserRead, UserUpdate, UserCreate
 from typing import Optional
 from fastapi import UploadFile, File
-import shutil, os
+from starlette.concurrency import run_in_threadpool
 
 from app.utils.logging import log_task_action
+from app.utils.events import publish_event
+from app.utils.user_index import get_active_user_ids
+from app.utils.credits import rotation_credits
+from app.utils.queue import get_queue, insert_user_into_queues, resolve_next_user_id
+from app.utils.media import store_profile_photo
+from app.utils.etag import current_etag, get_data_version, is_not_modified, not_modified_response, set_etag
+from app.utils.serialization import USER_LIST_ADAPTER, dump_json, json_response, user_list_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=list[UserRead])
-def list_users(active: Optional[bool] = None, session: Session = Depends(get_session)):
-    query = select(User)
-    if active is not None:
-        query = query.where(User.active == active)
-    users = session.exec(query).all()
-    return users
+async def list_users(request: Request, response: Response, active: Optional[bool] = None, db=Depends(get_read_session)):
+    etag = current_etag()
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    cache_key = (get_data_version(), active)
+    body = user_list_cache.get(cache_key)
+    if body is None:
+        query = select(User)
+        if active is not None:
+            query = query.where(User.active == active)
+        body = dump_json(USER_LIST_ADAPTER, await db.all(query))
+        user_list_cache.put(cache_key, body)
+    return json_response(body, response)
 
 @router.patch("/{user_id}", response_model=UserRead)
 def update_user(user_id: int, user_update: UserUpdate, session: Session = Depends(get_session)):
@@ -37,36 +52,42 @@ def update_user(user_id: int, user_update: UserUpdate, session: Session = Depend
 
     session.commit()
     session.refresh(user)
+    publish_event("user", "updated", user.id, UserRead.model_validate(user).model_dump())
     return user
 
 
 @router.post("/{user_id}/upload-photo")
-def upload_photo(user_id: int, file: UploadFile = File(...), session: Session = Depends(get_session)):
-    filename = f"/var/www/putzplan/media/profiles/{user_id}.jpg"
-    os.makedirs("/var/www/putzplan/media/profiles", exist_ok=True)
-    
-    with open(filename, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    user = session.get(User, user_id)
+async def upload_photo(user_id: int, file: UploadFile = File(...), session: Session = Depends(get_session)):
+    # Erst prüfen, ob es den User gibt, dann den Upload anfassen
+    user = await run_in_threadpool(session.get, User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.profile_image_url = f"/var/www//putzplan/media/profiles/{user_id}.jpg"
-    session.add(user)
-    session.commit()
-    log_task_action(session, 0, action="picture upload", user_id=user_id)
-    session.commit()
-    return {"message": "Foto gespeichert", "url": user.profile_image_url}
+    url = await store_profile_photo(file)
+
+    def save():
+        user.profile_image_url = url
+        session.add(user)
+        log_task_action(session, 0, action="picture upload", user_id=user_id)
+        session.commit()
+        session.refresh(user)
+        return UserRead.model_validate(user).model_dump()
+
+    user_data = await run_in_threadpool(save)
+    publish_event("user", "photo_uploaded", user_id, user_data)
+    return {"message": "Foto gespeichert", "url": url}
 
 @router.post("/", response_model=UserRead)
 def create_user(user: UserCreate, session: Session = Depends(get_session)):
     new_user = User(**user.dict())
     session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    session.flush()  # nur für new_user.id, Commit erst am Ende
+    # Neuen User in alle bestehenden Queues einsortieren
+    insert_user_into_queues(session, new_user.id)
     log_task_action(session, 0, action="created user", user_id=None)
     session.commit()
+    session.refresh(new_user)
+    publish_event("user", "created", new_user.id, UserRead.model_validate(new_user).model_dump())
     return new_user
 
 @router.get("/{user_id}", response_model=UserRead)
@@ -88,14 +109,15 @@ def get_next_recurring_user(task_id: int, session: Session = Depends(get_session
     # Holt den aktuellen User (falls vorhanden)
     current_user = session.get(User, task.user_id) if task.user_id else None
 
-    # 👉 Verwende jetzt die zentrale Funktion, die alles berücksichtigt (inkl. Blacklist!)
-    next_user = get_next_active_user(task, session)
+    # Queue nur einmal laden; Auflösung inkl. Blacklist läuft in-memory gegen den User-Index
+    queue = get_queue(session, task_id)
+    queue_list = queue.user_queue if queue and queue.user_queue else []
+
+    next_user_id = resolve_next_user_id(task, queue_list, get_active_user_ids(session), queue.cursor if queue else None, rotation_credits(session))
+    next_user = session.get(User, next_user_id) if next_user_id is not None else None
 
-    # Optional: Queue-Vorschau holen
-    queue = session.exec(
-        select(AssignmentQueue).where(AssignmentQueue.task_id == task_id)
-    ).first()
-    queue_preview = queue.user_queue[:10] if queue and queue.user_queue else []
+    # Optional: Queue-Vorschau
+    queue_preview = queue_list[:10]
 
     return {
         "task_id": task_id,
@@ -1,6 +1,6 @@
 from sqlmodel import SQLModel, Field, JSON
 from datetime import datetime
-from typing import Optional, Any, List
+from typing import Optional, Any, List, Literal
 from typing import Optional, Any
 
 from app.enums import TaskType
@@ -12,6 +12,7 @@ class TaskCreate(SQLModel):
     default_duration_days: int = 7
     credits: int = 1
     task_type: TaskType = TaskType.free
+    mode: str = "recurring"
     urgency_level: int = 0
     user_id: Optional[int] = None
 
@@ -24,6 +25,7 @@ class TaskRead(SQLModel):
     default_duration_days: int
     credits: int
     task_type: TaskType
+    mode: str = "recurring"
     remaining_days: int
     escalation_level: int = 0  # default 0, kann erhöht werden
 
@@ -31,6 +33,7 @@ class TaskRead(SQLModel):
     is_done: bool
     created_at: datetime
     last_completed_at: Optional[datetime]
+    due_at: Optional[datetime] = None
     remaining_days: int
     urgency_class: str  # NEU: 'green', 'yellow', 'red'
     duration_modifier: int = 0  # NEU
@@ -69,3 +72,13 @@ class TaskUpdate(SQLModel):
     task_type: Optional[str] = None
     mode: Optional[str] = None
     default_duration_days: Optional[int] = None  # NEU
+
+
+class TaskBatchOperation(SQLModel):
+    op: Literal["mark_done", "assign", "blacklist_add", "blacklist_remove", "update", "shuffle_queue"]
+    task_id: int
+    user_id: Optional[int] = None  # für assign und blacklist_*
+    fields: Optional[TaskUpdate] = None  # für update
+
+class TaskBatchRequest(SQLModel):
+    operations: List[TaskBatchOperation]
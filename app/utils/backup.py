@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import tempfile
+import zlib
+from typing import BinaryIO, Dict, Iterator, List
+
+from sqlalchemy.engine import Engine
+
+
+BACKUP_CHUNK_SIZE = 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+# wbits 31 = zlib mit gzip-Header/-Trailer
+GZIP_WBITS = 31
+
+
+def temp_path_next_to(path: str, suffix: str) -> str:
+    """Temp-Datei im selben Verzeichnis wie die DB (gleiches Dateisystem, gleiche Rechte)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=suffix, dir=directory)
+    os.close(fd)
+    return temp_path
+
+
+def remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def snapshot_database(db_engine: Engine, target_path: str):
+    """
+    Konsistenter Snapshot der laufenden DB per VACUUM INTO.
+    Läuft in einer einzigen Lesetransaktion: mit WAL werden Schreiber dabei nicht blockiert.
+    """
+    remove_quietly(target_path)  # VACUUM INTO will eine nicht existierende Datei
+    with db_engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM INTO ?", (target_path,))
+
+
+def _table_columns(conn: sqlite3.Connection, schema: str) -> Dict[str, List[str]]:
+    tables = [
+        row[0] for row in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+    ]
+    return {table: [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info("{table}")')] for table in tables}
+
+
+def restore_database(db_engine: Engine, source_path: str, backup_path: str):
+    """
+    Spielt eine geprüfte und migrierte DB-Datei in die laufende DB ein, statt die Datei zu tauschen.
+    Alles läuft in einer Schreibtransaktion (BEGIN IMMEDIATE): die Sicherung nach backup_path und der
+    Inhalt danach sehen denselben Stand, kein Commit eines anderen Requests geht dazwischen verloren.
+    Schlägt etwas fehl, wird zurückgerollt und die alte DB bleibt unverändert aktiv.
+    Offene Connections und WAL bleiben, wie sie sind; sie sehen nach dem Commit den neuen Inhalt.
+    """
+    connection = db_engine.raw_connection()
+    try:
+        conn = connection.driver_connection
+        conn.execute("ATTACH DATABASE ? AS upload", (source_path,))
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Sicherung des alten Stands unter demselben Schreib-Lock
+                remove_quietly(backup_path)
+                target = sqlite3.connect(backup_path)
+                try:
+                    conn.backup(target)
+                finally:
+                    target.close()
+
+                upload_tables = _table_columns(conn, "upload")
+                for table, columns in _table_columns(conn, "main").items():
+                    conn.execute(f'DELETE FROM main."{table}"')
+                    # beide Dateien sind auf demselben Schema-Stand; die Schnittmenge schützt nur vor Überraschungen
+                    shared = [c for c in columns if c in upload_tables.get(table, ())]
+                    if shared:
+                        column_list = ", ".join(f'"{c}"' for c in shared)
+                        conn.execute(f'INSERT INTO main."{table}" ({column_list}) SELECT {column_list} FROM upload."{table}"')
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.execute("DETACH DATABASE upload")
+    finally:
+        connection.close()
+
+
+def iter_file(path: str, compress: bool = False, delete: bool = False) -> Iterator[bytes]:
+    """Datei in Blöcken streamen, optional on-the-fly gzip. delete=True löscht sie danach."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, GZIP_WBITS) if compress else None
+    try:
+        with open(path, "rb") as source:
+            while chunk := source.read(BACKUP_CHUNK_SIZE):
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    yield chunk
+        if compressor:
+            yield compressor.flush()
+    finally:
+        if delete:
+            remove_quietly(path)
+
+
+def write_upload(source: BinaryIO, target_path: str) -> int:
+    """Upload blockweise auf die Platte schreiben, gzip wird am Header erkannt und entpackt."""
+    decompressor = None
+    written = 0
+    with open(target_path, "wb") as target:
+        first = True
+        while chunk := source.read(BACKUP_CHUNK_SIZE):
+            if first:
+                if chunk[:2] == GZIP_MAGIC:
+                    decompressor = zlib.decompressobj(GZIP_WBITS)
+                first = False
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+            target.write(chunk)
+            written += len(chunk)
+        if decompressor:
+            tail = decompressor.flush()
+            target.write(tail)
+            written += len(tail)
+    return written
+
+
+def check_database_file(path: str) -> str:
+    """
+    Prüft eine hochgeladene DB, bevor sie die aktive ersetzt.
+    Gibt eine Fehlermeldung zurück oder "" wenn alles passt.
+    """
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            result = conn.execute("PRAGMA integrity_check").fetchone()
+            if not result or result[0] != "ok":
+                return f"Integritätsprüfung fehlgeschlagen: {result[0] if result else 'keine Antwort'}"
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if "task" not in tables or "user" not in tables:
+                return "Keine Putzplan-Datenbank (Tabellen task/user fehlen)"
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return f"Keine gültige SQLite-Datei: {e}"
+    return ""
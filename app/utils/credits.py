@@ -0,0 +1,159 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from app.models import CreditLedger, User, UserCreditPeriod
+
+
+# Credit-Ledger: jede Erledigung schreibt eine Zeile (in derselben Transaktion wie mark_done),
+# User.points und UserCreditPeriod werden dabei direkt mitgezählt.
+# "queue": Rotation strikt nach Queue-Reihenfolge, "fair": wer im laufenden Monat
+# am wenigsten Credits hat, ist als Nächstes dran (Queue-Reihenfolge bei Gleichstand).
+ROTATION_STRATEGY = os.getenv("PUTZPLAN_ROTATION_STRATEGY", "queue")
+
+
+def month_period(at: datetime) -> str:
+    return at.strftime("%Y-%m")
+
+
+def week_period(at: datetime) -> str:
+    year, week, _ = at.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _bump_totals(session: Session, user_id: int, credits: int, completions: int, at: datetime):
+    session.execute(update(User).where(User.id == user_id).values(points=User.points + credits))
+    for period in (month_period(at), week_period(at)):
+        stmt = insert(UserCreditPeriod).values(user_id=user_id, period=period, credits=credits, completions=completions)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "period"],
+            set_={
+                "credits": UserCreditPeriod.credits + credits,
+                "completions": UserCreditPeriod.completions + completions,
+            },
+        ))
+
+
+def record_task_credit(session: Session, user_id: int, task_id: int, credits: int, task_version: int) -> CreditLedger:
+    """Gutschrift für eine Erledigung (ohne Commit)."""
+    entry = CreditLedger(user_id=user_id, task_id=task_id, task_version=task_version, credits=credits, reason="task_done")
+    session.add(entry)
+    _bump_totals(session, user_id, credits, 1, entry.timestamp)
+    return entry
+
+
+def reverse_task_credits(session: Session, task_id: int, from_version: int) -> int:
+    """
+    Undo: alle noch nicht stornierten Gutschriften ab from_version per Gegenbuchung aufheben.
+    Die Summen der ursprünglichen Zeiträume werden korrigiert. Gibt die Anzahl der Stornos zurück.
+    """
+    already_reversed = select(CreditLedger.reverses_id).where(CreditLedger.reverses_id.is_not(None))
+    entries = session.exec(
+        select(CreditLedger).where(
+            CreditLedger.task_id == task_id,
+            CreditLedger.reason.in_(("task_done", "redo")),
+            CreditLedger.task_version >= from_version,
+            CreditLedger.id.not_in(already_reversed),
+        )
+    ).all()
+    for entry in entries:
+        session.add(CreditLedger(
+            user_id=entry.user_id,
+            task_id=task_id,
+            task_version=entry.task_version,
+            credits=-entry.credits,
+            reason="undo",
+            reverses_id=entry.id,
+        ))
+        _bump_totals(session, entry.user_id, -entry.credits, -1, entry.timestamp)
+    return len(entries)
+
+
+def restore_task_credits(session: Session, task_id: int, from_version: int, to_version: int) -> int:
+    """
+    Redo: Stornos der Versionen from_version <= v < to_version wieder aufheben (Buchung "redo").
+    Gibt die Anzahl der wiederhergestellten Gutschriften zurück.
+    """
+    already_restored = select(CreditLedger.reverses_id).where(CreditLedger.reason.in_(("redo", "discarded")))
+    original = aliased(CreditLedger)
+    # Summen im Zeitraum der ursprünglichen Erledigung korrigieren, nicht in dem des Undo
+    rows = session.exec(
+        select(CreditLedger, original.timestamp)
+        .join(original, original.id == CreditLedger.reverses_id)
+        .where(
+            CreditLedger.task_id == task_id,
+            CreditLedger.reason == "undo",
+            CreditLedger.task_version >= from_version,
+            CreditLedger.task_version < to_version,
+            CreditLedger.id.not_in(already_restored),
+        )
+    ).all()
+    for entry, done_at in rows:
+        session.add(CreditLedger(
+            user_id=entry.user_id,
+            task_id=task_id,
+            task_version=entry.task_version,
+            credits=-entry.credits,
+            reason="redo",
+            reverses_id=entry.id,
+            timestamp=done_at,  # zählt wie die Erledigung selbst, ein späteres Undo storniert im selben Zeitraum
+        ))
+        _bump_totals(session, entry.user_id, -entry.credits, 1, done_at)
+    return len(rows)
+
+
+def discard_redo_credits(session: Session, task_id: int, from_version: int) -> int:
+    """
+    Neue Änderung nach einem Undo: die Versionsnummern ab from_version werden neu vergeben,
+    deren Stornos sind damit endgültig (Null-Buchung "discarded", damit kein späteres Redo sie aufhebt).
+    """
+    already_restored = select(CreditLedger.reverses_id).where(CreditLedger.reason.in_(("redo", "discarded")))
+    entries = session.exec(
+        select(CreditLedger).where(
+            CreditLedger.task_id == task_id,
+            CreditLedger.reason == "undo",
+            CreditLedger.task_version >= from_version,
+            CreditLedger.id.not_in(already_restored),
+        )
+    ).all()
+    for entry in entries:
+        session.add(CreditLedger(
+            user_id=entry.user_id,
+            task_id=task_id,
+            task_version=entry.task_version,
+            credits=0,
+            reason="discarded",
+            reverses_id=entry.id,
+        ))
+    return len(entries)
+
+
+def credits_by_user(session: Session, period: str) -> Dict[int, int]:
+    rows = session.exec(select(UserCreditPeriod.user_id, UserCreditPeriod.credits).where(UserCreditPeriod.period == period)).all()
+    return {user_id: credits for user_id, credits in rows}
+
+
+def rotation_credits(session: Session) -> Optional[Dict[int, int]]:
+    """Credits des laufenden Monats für die faire Rotation, None bei reiner Queue-Rotation."""
+    if ROTATION_STRATEGY != "fair":
+        return None
+    return credits_by_user(session, month_period(datetime.utcnow()))
+
+
+def build_leaderboard(users: List[User], rollups: Optional[Dict[int, UserCreditPeriod]]) -> List[dict]:
+    """rollups=None: Gesamtstand aus User.points, sonst die Summen eines Zeitraums."""
+    entries = []
+    for user in users:
+        if rollups is None:
+            credits, completions = user.points, None
+        else:
+            rollup = rollups.get(user.id)
+            credits, completions = (rollup.credits, rollup.completions) if rollup else (0, 0)
+        entries.append({"user_id": user.id, "name": user.name, "active": user.active, "credits": credits, "completions": completions})
+    entries.sort(key=lambda e: (-e["credits"], e["name"]))
+    return entries
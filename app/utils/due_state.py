@@ -0,0 +1,115 @@
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, func, update
+from sqlmodel import Session, select
+
+from app.enums import TaskType
+from app.models import Task
+from app.utils.events import publish_event
+from app.utils.logging import log_task_action, log_task_version_auto
+
+
+# Fälligkeit einer Aufgabe: wird als Task.due_at/remaining_days gespeichert, damit die DB
+# danach filtern kann. Genutzt von den Routen, dem Scheduler (app/utils/jobs.py) und den Migrationen.
+
+
+def compute_due_at(task: Task) -> Optional[datetime]:
+    """
+    Fälligkeitszeitpunkt, der als Task.due_at gespeichert wird (Mitternacht UTC des Fälligkeitstags).
+    Muss bei allem neu berechnet werden, was Fälligkeit beeinflusst (Erledigen, Reset, Votes, Dauer).
+    """
+    # 1️⃣ Einmalige Aufgaben: das due_date
+    if task.mode == TaskType.one_time:
+        if task.due_date:
+            return datetime.combine(task.due_date.date(), time.min)
+        # ohne due_date kann man nichts rechnen
+        return None
+    # Wiederkehrend: ab letzter Erledigung (bzw. Erstellung) + Dauer + Modifier
+    base = task.last_completed_at or task.created_at or datetime.utcnow()
+    days = task.default_duration_days + task.duration_modifier
+    return datetime.combine(base.date(), time.min) + timedelta(days=days)
+
+
+def refresh_due_state(task: Task):
+    task.due_at = compute_due_at(task)
+    # gecachter Wert, den die Routen ausliefern; der Scheduler hält ihn über Tageswechsel aktuell
+    task.remaining_days = calculate_remaining_days(task)
+
+
+def calculate_remaining_days(task: Task) -> int:
+    today = datetime.utcnow().date()
+    due_at = task.due_at or compute_due_at(task)
+    if due_at is None:
+        return 0
+    return max((due_at.date() - today).days, 0)
+
+
+def remaining_days_sql(today: date):
+    # SQL-Pendant zu calculate_remaining_days (SQLite: julianday, skalares max)
+    days = func.julianday(func.date(Task.due_at)) - func.julianday(today.isoformat())
+    return func.max(func.coalesce(days, 0), 0)
+
+
+def calculate_urgency_class(task: Task, remaining_days: int) -> str:
+    # Immer rot, wenn Eskalation aktiv ist
+    if task.escalation_level >= 1:
+        return 'red'
+
+    # Wenn keine Dauer definiert ist (zur Sicherheit)
+    if not task.default_duration_days or task.default_duration_days == 0:
+        return 'green'  # fallback: keine Info = unkritisch
+
+    # Berechne den Prozentsatz
+    percentage_left = (remaining_days / task.default_duration_days) * 100
+
+    if percentage_left < 15:
+        return 'red'
+    elif percentage_left < 40:
+        return 'yellow'
+    else:
+        return 'green'
+
+
+def build_task_read(task: Task) -> dict:
+    remaining_days = task.remaining_days
+    urgency_class = calculate_urgency_class(task, remaining_days)
+    task_data = task.dict()
+    task_data["remaining_days"] = remaining_days
+    task_data["urgency_class"] = urgency_class
+    return task_data
+
+
+def publish_task_event(task: Task, action: str):
+    publish_event("task", action, task.id, build_task_read(task))
+
+
+def run_due_state_pass(session: Session, today: Optional[date] = None) -> Tuple[int, List[Task]]:
+    """
+    Zeitgesteuerter Batch-Lauf (s. app/utils/jobs.py), ohne Commit:
+    remaining_days aller Tasks in einem UPDATE aus due_at neu berechnen und
+    überfällige, noch nicht eskalierte Tasks automatisch eskalieren.
+    Gibt (Anzahl geänderter Tasks, eskalierte Tasks) zurück.
+    """
+    today = today or datetime.utcnow().date()
+    remaining = cast(remaining_days_sql(today), Integer)
+    # remaining_days ist nur ein Cache von due_at, daher ohne Version
+    updated = session.execute(
+        update(Task).where(Task.remaining_days != remaining).values(remaining_days=remaining)
+    ).rowcount or 0
+
+    # Eskalation ist eine echte Änderung: über den versionierten Schreibpfad wie vote_escalate,
+    # damit Undo/Redo sie sieht und ein offener Redo-Zweig verworfen wird
+    escalated = session.exec(
+        select(Task).where(
+            Task.due_at < datetime.combine(today, time.min),
+            Task.is_done == False,
+            Task.escalation_level == 0,
+        )
+    ).all()
+    for task in escalated:
+        log_task_version_auto(task, session, action="auto_escalated")
+        task.escalation_level = 1
+        session.add(task)
+        log_task_action(session, task.id, action="auto_escalated", user_id=None, task_version=task.iteration)
+    return updated, list(escalated)
@@ -0,0 +1,60 @@
+import threading
+import uuid
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.utils.tenants import TENANT_HEADER, TENANT_MODE, current_tenant
+
+
+# Globaler Änderungszähler: jeder Schreibzugriff erhöht ihn (über publish_event).
+# Der Boot-Token sorgt dafür, dass nach einem Neustart (Zähler wieder bei 0)
+# keine alten ETags fälschlich als aktuell gelten.
+# Im Multi-WG-Modus zählt jeder Tenant für sich (Key None = normale Datenbank).
+_boot_token = uuid.uuid4().hex[:8]
+_data_versions: Dict[Optional[str], int] = {}
+_lock = threading.Lock()
+
+
+def bump_data_version() -> int:
+    tenant = current_tenant.get()
+    with _lock:
+        version = _data_versions.get(tenant, 0) + 1
+        _data_versions[tenant] = version
+        return version
+
+
+def get_data_version() -> int:
+    return _data_versions.get(current_tenant.get(), 0)
+
+
+def current_etag(suffix: Optional[str] = None) -> str:
+    """
+    Schwaches ETag aus Boot-Token und Datenversion.
+    suffix für Antworten, die zusätzlich von etwas anderem abhängen (z.B. dem Datum).
+    """
+    tenant = current_tenant.get()
+    tag = f"{_boot_token}-{get_data_version()}" if tenant is None else f"{_boot_token}-{tenant}-{get_data_version()}"
+    if suffix:
+        tag = f"{tag}-{suffix}"
+    return f'W/"{tag}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Browser soll jedes Mal nachfragen (If-None-Match), aber den Body cachen dürfen
+    response.headers["Cache-Control"] = "no-cache"
+    if TENANT_MODE == "header":
+        response.headers["Vary"] = TENANT_HEADER
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.etag import bump_data_version
+from app.utils.logging import auto_serialize
+from app.utils.tenants import current_tenant
+
+
+# Jeder verbundene Client (SSE) bekommt eine eigene asyncio.Queue.
+# Die Routen laufen als sync-Funktionen im Threadpool, daher wird über
+# loop.call_soon_threadsafe in die Queues des Event-Loops geschrieben.
+# Im Multi-WG-Modus bekommt ein Client nur die Events seines Tenants.
+_subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue, Optional[str]]] = []
+_lock = threading.Lock()
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def subscribe() -> asyncio.Queue:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _subscribers.append((loop, queue, current_tenant.get()))
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue):
+    with _lock:
+        _subscribers[:] = [(l, q, t) for (l, q, t) in _subscribers if q is not queue]
+
+
+def _deliver(queue: asyncio.Queue, event: Dict[str, Any]):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Client kommt nicht hinterher -> Reset erzwingen, Client lädt komplett neu
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"id": event["id"], "type": "reset", "action": "overflow", "entity_id": None, "data": None})
+
+
+def publish_event(type: str, action: str, entity_id: Optional[int] = None, data: Any = None):
+    """
+    Verteilt ein Änderungs-Event an alle verbundenen Clients.
+    type: "task", "user" oder "queue"; data ist der neue Zustand (oder None bei Löschung).
+    Erhöht dabei die globale Datenversion (ETag), die Event-ID ist diese Version.
+    """
+    version = bump_data_version()
+    with _lock:
+        event = {
+            "id": version,
+            "type": type,
+            "action": action,
+            "entity_id": entity_id,
+            "data": auto_serialize(data),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        tenant = current_tenant.get()
+        subscribers = [(l, q) for (l, q, t) in _subscribers if t == tenant]
+
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(_deliver, queue, event)
+        except RuntimeError:
+            # Loop bereits geschlossen
+            unsubscribe(queue)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,156 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from app.models import AssignmentQueue, Task, User
+from app.utils.queue import find_current_slot
+from app.utils.tenants import current_tenant
+
+
+# Vorschau, wer wann welche Aufgabe hat.
+# Keine Tag-für-Tag-Simulation: pro Task stehen Termine (first + k * interval) und
+# Zuständige (Rotationszyklus, k-ter Eintrag) arithmetisch fest, die Last pro User
+# ergibt sich per divmod aus der Anzahl der Termine. Aufwand O(Tasks * Queue-Länge).
+# Bildet die Queue-Rotation ab; mit PUTZPLAN_ROTATION_STRATEGY=fair ist es nur eine Näherung.
+FORECAST_CACHE_SIZE = 16
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+
+
+def get_cached_forecast(key: Hashable) -> Optional[Dict[str, Any]]:
+    key = (current_tenant.get(), key)
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+        return result
+
+
+def store_forecast(key: Hashable, result: Dict[str, Any]):
+    key = (current_tenant.get(), key)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > FORECAST_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def rotation_cycle(task: Task, queue: Optional[AssignmentQueue], active_user_ids: Set[int]) -> List[int]:
+    """
+    Reihenfolge, in der mark_done die Aufgabe weitergibt (ab dem User nach dem aktuellen),
+    gefiltert wie resolve_next_slot: nur aktive, nicht geblacklistete User.
+    """
+    queue_list = (queue.user_queue or []) if queue else []
+    current = find_current_slot(task, queue_list, queue.cursor if queue else None)
+    if current is None:
+        return []
+    length = len(queue_list)
+    return [
+        user_id
+        for user_id in (queue_list[(current + offset) % length] for offset in range(1, length + 1))
+        if user_id in active_user_ids and not task.is_user_blacklisted(user_id)
+    ]
+
+
+def occurrence_count(first: date, interval: int, until: date, recurring: bool) -> int:
+    if first > until:
+        return 0
+    if not recurring:
+        return 1
+    return (until - first).days // interval + 1
+
+
+def build_forecast(
+    tasks: Iterable[Task],
+    queues: Iterable[AssignmentQueue],
+    users: Iterable[User],
+    is_rotating: Callable[[Task], bool],
+    today: date,
+    weeks: int,
+    include_schedule: bool = True,
+) -> Dict[str, Any]:
+    until = today + timedelta(weeks=weeks) - timedelta(days=1)
+    users = list(users)
+    active_user_ids = {u.id for u in users if u.active}
+    queue_by_task = {q.task_id: q for q in queues}
+
+    assigned_count: Dict[int, int] = {}
+    assigned_credits: Dict[int, int] = {}
+    unassigned = {"count": 0, "credits": 0}
+    shared_credits = 0  # freie Aufgaben: erwartet gleichmäßig auf alle Aktiven verteilt
+    task_entries = []
+
+    def add_load(user_id: int, count: int, credits: int):
+        assigned_count[user_id] = assigned_count.get(user_id, 0) + count
+        assigned_credits[user_id] = assigned_credits.get(user_id, 0) + count * credits
+
+    for task in tasks:
+        if task.is_done or task.due_at is None:
+            continue
+        recurring = task.mode == "recurring"
+        interval = max(task.default_duration_days, 1)
+        # Überfälliges ist "heute" dran, danach wird ab Erledigung neu gezählt
+        first = max(task.due_at.date(), today)
+        count = occurrence_count(first, interval, until, recurring)
+        if count == 0:
+            continue
+
+        rotating = is_rotating(task) and task.user_id is not None
+        cycle = rotation_cycle(task, queue_by_task.get(task.id), active_user_ids) if rotating else []
+
+        if rotating:
+            # Termin 0 hat der aktuelle User, danach reihum; ohne Nachfolger bleibt es bei ihm
+            add_load(task.user_id, 1, task.credits)
+            if cycle:
+                full_rounds, rest = divmod(count - 1, len(cycle))
+                for position, user_id in enumerate(cycle):
+                    add_load(user_id, full_rounds + (1 if position < rest else 0), task.credits)
+            else:
+                add_load(task.user_id, count - 1, task.credits)
+        else:
+            unassigned["count"] += count
+            unassigned["credits"] += count * task.credits
+            if not is_rotating(task):
+                shared_credits += count * task.credits
+
+        entry = {
+            "task_id": task.id,
+            "title": task.title,
+            "mode": task.mode,
+            "interval_days": interval if recurring else None,
+            "occurrences": count,
+        }
+        if include_schedule:
+            entry["schedule"] = [
+                {
+                    "date": first + timedelta(days=k * interval),
+                    "user_id": (task.user_id if k == 0 or not cycle else cycle[(k - 1) % len(cycle)]) if rotating else None,
+                }
+                for k in range(count)
+            ]
+        task_entries.append(entry)
+
+    share = shared_credits / len(active_user_ids) if active_user_ids else 0.0
+    user_entries = []
+    for user in users:
+        credits = assigned_credits.get(user.id, 0)
+        shared = share if user.id in active_user_ids else 0.0
+        user_entries.append({
+            "user_id": user.id,
+            "name": user.name,
+            "active": user.active,
+            "assigned_count": assigned_count.get(user.id, 0),
+            "assigned_credits": credits,
+            "shared_credits": round(shared, 2),
+            "expected_credits": round(credits + shared, 2),
+        })
+
+    return {
+        "from": today,
+        "until": until,
+        "weeks": weeks,
+        "users": user_entries,
+        "unassigned": unassigned,
+        "tasks": task_entries,
+    }
@@ -0,0 +1,63 @@
+import logging
+from datetime import date, datetime
+from typing import Dict, Optional
+
+from sqlmodel import Session
+
+from app.database import get_engine
+from app.utils.due_state import publish_task_event, run_due_state_pass
+from app.utils.events import publish_event
+from app.utils.stats import catch_up_stats
+from app.utils.tenants import TENANT_MODE, current_tenant, known_tenants, tenant_context
+from app.utils.versions import VERSION_RETENTION, compact_task_versions
+
+
+# Jobs, die app/utils/scheduler.py periodisch und nach Mitternacht (UTC) ausführt.
+# Ein Lauf geht über die Standard-DB und im Multi-WG-Modus über alle Tenants.
+logger = logging.getLogger(__name__)
+# Letzter Tag, an dem die Versionen einer DB kompaktiert wurden (Schlüssel: Tenant, None = Standard-DB)
+_last_compaction: Dict[Optional[str], date] = {}
+
+
+def scheduled_due_state_pass():
+    """Täglicher/periodischer Lauf: remaining_days nachziehen, Überfälliges eskalieren, Statistik nachholen."""
+    with Session(get_engine()) as session:
+        updated, escalated = run_due_state_pass(session)
+        # Logs aus alten/importierten Datenbanken in die Tages-Rollups einrechnen
+        catch_up_stats(session)
+        session.commit()
+        for task in escalated:
+            session.refresh(task)
+            publish_task_event(task, "auto_escalated")
+    if updated:
+        # Tageswechsel betrifft fast alle Tasks -> ein Reset statt N Einzel-Events
+        publish_event("reset", "due_state_rollover")
+
+
+def scheduled_version_compaction(today: Optional[date] = None) -> int:
+    """Nächtliche Retention der TaskVersions (wie POST /api/tasks/versions/compact), einmal pro Tag und DB."""
+    today = today or datetime.utcnow().date()
+    tenant = current_tenant.get()
+    if _last_compaction.get(tenant) == today:
+        return 0
+    with Session(get_engine()) as session:
+        removed = compact_task_versions(session, VERSION_RETENTION)
+        session.commit()
+    _last_compaction[tenant] = today
+    if removed:
+        logger.info("%d alte Task-Versionen kompaktiert", removed)
+    return removed
+
+
+def run_database_jobs():
+    scheduled_due_state_pass()
+    scheduled_version_compaction()
+
+
+def run_scheduled_jobs():
+    # Tenants nacheinander; der Engine-Cache hält dabei nur begrenzt viele DBs offen
+    run_database_jobs()
+    if TENANT_MODE != "off":
+        for tenant in known_tenants():
+            with tenant_context(tenant):
+                run_database_jobs()
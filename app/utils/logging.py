@@ -4,18 +4,28 @@ from sqlmodel import Session
 from app.models import TaskLog
 from typing import Optional
 
-from app.models import TaskVersion
+from app.utils.stats import aggregate_log, discard_redo_stats, parse_action
+from app.utils.credits import discard_redo_credits
+from app.utils.undo import encode_task
+from app.utils.versions import build_version_row, discard_versions_after
 
 
 
-def log_task_action(session, task_id: int, action: str, user_name: Optional[str] = None, user_id: Optional[int] = None):
+def log_task_action(session, task_id: int, action: str, user_name: Optional[str] = None, user_id: Optional[int] = None, value: Optional[int] = None, task_version: Optional[int] = None):
+    event, target_user_id = parse_action(action)
     log_entry = TaskLog(
         task_id=task_id,
         user_id=user_id,
         user_name=user_name,
         action=action,
-        timestamp=datetime.utcnow()
+        timestamp=datetime.utcnow(),
+        event=event,
+        target_user_id=target_user_id,
+        value=value,
+        task_version=task_version,
     )
+    # Tages-Rollups in derselben Transaktion fortschreiben
+    aggregate_log(session, log_entry)
     session.add(log_entry)
 
 def auto_serialize(obj):
@@ -29,15 +39,25 @@ def auto_serialize(obj):
         return obj
 
 def log_task_version_auto(task, session, action: str, user_id: int = None, user_name: str = None):
+    if task.undo_pointer is not None:
+        # Änderung nach Undo: der Redo-Zweig ab der aktiven Version wird verworfen,
+        # die neue Version übernimmt deren Nummer (ihr Snapshot ist derselbe Stand)
+        discard_versions_after(session, task.id, task.undo_pointer - 1)
+        discard_redo_credits(session, task.id, task.undo_pointer)
+        discard_redo_stats(session, task.id, task.undo_pointer)
+        task.iteration = task.undo_pointer - 1
+        task.undo_pointer = None
     task.iteration += 1
-    task_version = TaskVersion(
-        task_id=task.id,
-        version=task.iteration,
+    # Delta gegenüber der Vorversion, regelmäßig ein voller Keyframe
+    task_version = build_version_row(
+        session,
+        task.id,
+        task.iteration,
+        encode_task(task),
         user_id=user_id,
         user_name=user_name,
         action=action,
-        data=auto_serialize(task.dict())
     )
     session.add(task_version)
     session.add(task)
-    session.commit()
+    # kein Commit: Snapshot, Log und Änderung landen in derselben Transaktion der Route
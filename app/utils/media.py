@@ -0,0 +1,89 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+
+# Caddy liefert MEDIA_DIR unter /media/ aus
+MEDIA_DIR = os.getenv("PUTZPLAN_MEDIA_DIR", "/var/www/putzplan/media")
+PROFILE_DIR = os.path.join(MEDIA_DIR, "profiles")
+PROFILE_URL_PREFIX = "/media/profiles/"
+PHOTO_MAX_BYTES = int(os.getenv("PUTZPLAN_PHOTO_MAX_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Bildtyp am Dateianfang erkennen statt dem Content-Type des Browsers zu glauben
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+
+def sniff_image_extension(head: bytes) -> Optional[str]:
+    for signature, extension in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _open_temp_file():
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".upload-", dir=PROFILE_DIR)
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _finalize(temp_path: str, target_path: str):
+    if os.path.exists(target_path):
+        # Gleicher Inhalt schon vorhanden -> Dedupe
+        os.remove(temp_path)
+    else:
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, target_path)
+
+
+async def store_profile_photo(file: UploadFile) -> str:
+    """
+    Upload blockweise lesen, dabei hashen und die Größe begrenzen.
+    Der Dateiname ist der SHA-256 des Inhalts: die URL ändert sich genau dann, wenn
+    sich das Bild ändert, und darf deshalb unbegrenzt gecacht werden.
+    Gibt die öffentliche URL zurück.
+    """
+    if file.size is not None and file.size > PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Foto zu groß (max. {PHOTO_MAX_BYTES // 1024} KiB)")
+
+    digest = hashlib.sha256()
+    size = 0
+    extension = None
+    buffer, temp_path = await run_in_threadpool(_open_temp_file)
+    try:
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if extension is None:
+                    extension = sniff_image_extension(chunk)
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="Nur JPEG, PNG, GIF oder WebP erlaubt")
+                size += len(chunk)
+                if size > PHOTO_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Foto zu groß (max. {PHOTO_MAX_BYTES // 1024} KiB)")
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+
+        if extension is None:
+            raise HTTPException(status_code=400, detail="Leere Datei")
+
+        filename = f"{digest.hexdigest()}.{extension}"
+        await run_in_threadpool(_finalize, temp_path, os.path.join(PROFILE_DIR, filename))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return PROFILE_URL_PREFIX + filename
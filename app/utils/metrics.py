@@ -0,0 +1,183 @@
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Request-Metriken im Prometheus-Textformat (GET /api/metrics).
+# Zähler und In-Flight laufen immer mit; Latenz-Histogramme und SQL-Accounting nur für
+# gesampelte Requests (PUTZPLAN_METRICS_SAMPLE_RATE, z.B. 0.1 in Produktion).
+METRICS_ENABLED = os.getenv("PUTZPLAN_METRICS", "1") == "1"
+METRICS_SAMPLE_RATE = float(os.getenv("PUTZPLAN_METRICS_SAMPLE_RATE", "1.0"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Langlebige Streams (SSE) und der Scrape selbst würden die Histogramme verzerren
+UNTIMED_ROUTES = {"/api/events", "/api/metrics"}
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+# Wird im Middleware-Task gesetzt und in den Threadpool (sync-Routen, get_session) mitkopiert
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+_lock = threading.Lock()
+_requests_total: Dict[Tuple[str, str, int], int] = {}
+_in_flight: Dict[Tuple[str, str], int] = {}
+_latency: Dict[Tuple[str, str], Histogram] = {}
+_sql_count: Dict[Tuple[str, str], Histogram] = {}
+_sql_seconds: Dict[Tuple[str, str], float] = {}
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request_stats.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    starts = conn.info.get("metrics_query_start")
+    if stats is None or not starts:
+        return
+    stats.sql_count += 1
+    stats.sql_seconds += time.perf_counter() - starts.pop()
+
+
+def _route_label(scope) -> str:
+    # Routen-Template statt konkretem Pfad, sonst explodiert die Label-Kardinalität
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Reine ASGI-Middleware: misst bis zum Ende der Antwort, nicht nur bis zu den Headern."""
+
+    def __init__(self, app, sample_rate: float = METRICS_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        path_key = (method, scope["path"])
+        status = {"code": 500}
+        sampled = random.random() < self.sample_rate
+        stats = RequestStats() if sampled else None
+        token = current_request_stats.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with _lock:
+            _in_flight[path_key] = _in_flight.get(path_key, 0) + 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_stats.reset(token)
+            _record(method, _route_label(scope), path_key, status["code"], elapsed, stats)
+
+
+def _record(method: str, route: str, path_key: Tuple[str, str], status: int, elapsed: float, stats: Optional[RequestStats]):
+    key = (method, route)
+    with _lock:
+        _in_flight[path_key] -= 1
+        if not _in_flight[path_key]:
+            del _in_flight[path_key]
+        _requests_total[(method, route, status)] = _requests_total.get((method, route, status), 0) + 1
+        if stats is None or route in UNTIMED_ROUTES:
+            return
+        _latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+        _sql_count.setdefault(key, Histogram(SQL_COUNT_BUCKETS)).observe(stats.sql_count)
+        _sql_seconds[key] = _sql_seconds.get(key, 0.0) + stats.sql_seconds
+
+
+def _labels(**labels) -> str:
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for name, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, histograms: Dict[Tuple[str, str], Histogram]):
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {histogram.total}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.total}")
+
+
+def render_prometheus() -> str:
+    with _lock:
+        lines = [
+            "# HELP putzplan_http_requests_total Abgeschlossene HTTP-Requests (alle, ungesampelt).",
+            "# TYPE putzplan_http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(_requests_total.items()):
+            lines.append(f"putzplan_http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        lines += [
+            "# HELP putzplan_http_requests_in_flight Laufende Requests (inkl. offener SSE-Streams).",
+            "# TYPE putzplan_http_requests_in_flight gauge",
+        ]
+        for (method, path), count in sorted(_in_flight.items()):
+            lines.append(f"putzplan_http_requests_in_flight{_labels(method=method, path=path)} {count}")
+
+        lines += [
+            "# HELP putzplan_http_request_duration_seconds Latenz gesampelter Requests.",
+            "# TYPE putzplan_http_request_duration_seconds histogram",
+        ]
+        _render_histogram(lines, "putzplan_http_request_duration_seconds", _latency)
+
+        lines += [
+            "# HELP putzplan_sql_statements_per_request SQL-Statements pro gesampeltem Request.",
+            "# TYPE putzplan_sql_statements_per_request histogram",
+        ]
+        _render_histogram(lines, "putzplan_sql_statements_per_request", _sql_count)
+
+        lines += [
+            "# HELP putzplan_sql_seconds_total Summierte SQL-Ausführungszeit gesampelter Requests.",
+            "# TYPE putzplan_sql_seconds_total counter",
+        ]
+        for (method, route), seconds in sorted(_sql_seconds.items()):
+            lines.append(f"putzplan_sql_seconds_total{_labels(method=method, route=route)} {seconds}")
+
+        lines += [
+            "# HELP putzplan_metrics_sample_rate Anteil der Requests mit Latenz-/SQL-Messung.",
+            "# TYPE putzplan_metrics_sample_rate gauge",
+            f"putzplan_metrics_sample_rate {METRICS_SAMPLE_RATE}",
+        ]
+    return "\n".join(lines) + "\n"
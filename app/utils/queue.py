@@ -0,0 +1,135 @@
+import random
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm.attributes import flag_modified
+from sqlmodel import Session, select
+
+from app.models import AssignmentQueue, Task, User
+
+
+# Die Queue enthält nur echte User-IDs (in zufälliger Reihenfolge) plus einen Cursor,
+# der auf die Position des aktuell zugewiesenen Users zeigt.
+
+
+def queue_query(task_id: int):
+    return select(AssignmentQueue).where(AssignmentQueue.task_id == task_id)
+
+
+def get_queue(session: Session, task_id: int) -> Optional[AssignmentQueue]:
+    return session.exec(queue_query(task_id)).first()
+
+
+def find_current_slot(task: Task, queue_list: List[int], cursor: Optional[int] = None) -> Optional[int]:
+    # Normalfall O(1): Cursor zeigt auf den aktuellen User
+    if cursor is not None and 0 <= cursor < len(queue_list) and queue_list[cursor] == task.user_id:
+        return cursor
+    # Fallback (z.B. nach manueller Zuweisung ohne Queue-Update)
+    try:
+        return queue_list.index(task.user_id)
+    except ValueError:
+        return None
+
+
+def resolve_next_slot(
+    task: Task,
+    queue_list: List[int],
+    active_user_ids: Set[int],
+    cursor: Optional[int] = None,
+    credits_by_user: Optional[Dict[int, int]] = None,
+) -> Optional[int]:
+    """
+    Position des nächsten aktiven, nicht geblacklisteten Users nach dem aktuellen.
+    Mit credits_by_user (faire Rotation) gewinnt der Kandidat mit den wenigsten Credits,
+    bei Gleichstand der in Queue-Reihenfolge nächste. Reine In-Memory-Auflösung.
+    """
+    if not queue_list:
+        return None
+
+    current_index = find_current_slot(task, queue_list, cursor)
+    if current_index is None:
+        return None  # Aktueller User nicht in der Queue
+
+    best_index = None
+    for offset in range(1, len(queue_list) + 1):
+        next_index = (current_index + offset) % len(queue_list)
+        next_user_id = queue_list[next_index]
+        if next_user_id in active_user_ids and not task.is_user_blacklisted(next_user_id):
+            if credits_by_user is None:
+                return next_index
+            if best_index is None or credits_by_user.get(next_user_id, 0) < credits_by_user.get(queue_list[best_index], 0):
+                best_index = next_index
+
+    return best_index
+
+
+def resolve_next_user_id(
+    task: Task,
+    queue_list: List[int],
+    active_user_ids: Set[int],
+    cursor: Optional[int] = None,
+    credits_by_user: Optional[Dict[int, int]] = None,
+) -> Optional[int]:
+    slot = resolve_next_slot(task, queue_list, active_user_ids, cursor, credits_by_user)
+    return queue_list[slot] if slot is not None else None
+
+
+def new_queue(task: Task, user_ids: Iterable[int]) -> AssignmentQueue:
+    queue_list = list(user_ids)
+    random.shuffle(queue_list)
+    queue = AssignmentQueue(task_id=task.id, user_queue=queue_list)
+    sync_cursor(queue, task.user_id)
+    return queue
+
+
+def sync_cursor(queue: AssignmentQueue, user_id: Optional[int]):
+    if user_id in (queue.user_queue or []):
+        queue.cursor = queue.user_queue.index(user_id)
+    else:
+        queue.cursor = 0
+
+
+def shuffle_queue(queue: AssignmentQueue, current_user_id: Optional[int]):
+    queue_list = list(queue.user_queue or [])
+    random.shuffle(queue_list)
+    queue.user_queue = queue_list
+    sync_cursor(queue, current_user_id)
+
+
+def insert_user_into_queues(session: Session, user_id: int):
+    """Neuen User an zufälliger Stelle in jede Queue einfügen, ohne den Rest neu zu würfeln."""
+    for queue in session.exec(select(AssignmentQueue)).all():
+        queue_list = queue.user_queue or []
+        if user_id in queue_list:
+            continue
+        position = random.randint(0, len(queue_list))
+        # Cursor muss weiter auf denselben User zeigen
+        if queue_list and position <= queue.cursor:
+            queue.cursor += 1
+        queue_list.insert(position, user_id)
+        queue.user_queue = queue_list
+        flag_modified(queue, "user_queue")
+        session.add(queue)
+
+
+def compact_assignment_queues(session: Session) -> int:
+    """
+    Alte Queues (100 IDs, egal ob User existiert) auf die echten User eindampfen.
+    Gibt die Anzahl geänderter Queues zurück.
+    """
+    user_ids = set(session.exec(select(User.id)).all())
+    # nur die Spalten, die es schon im Basisschema gibt (läuft als Migration)
+    current_user_by_task = dict(session.exec(select(Task.id, Task.user_id)).all())
+    changed = 0
+    for queue in session.exec(select(AssignmentQueue)).all():
+        queue_list = queue.user_queue or []
+        compacted = [uid for uid in queue_list if uid in user_ids]
+        missing = [uid for uid in user_ids if uid not in compacted]
+        if len(compacted) == len(queue_list) and not missing:
+            continue
+        random.shuffle(missing)
+        queue.user_queue = compacted + missing
+        sync_cursor(queue, current_user_by_task.get(queue.task_id))
+        flag_modified(queue, "user_queue")
+        session.add(queue)
+        changed += 1
+    return changed
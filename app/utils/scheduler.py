@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, time, timedelta
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+# In-Process-Scheduler für zeitgesteuerten Task-Zustand (Tageswechsel, Eskalation).
+# Läuft beim Start, danach alle SCHEDULER_INTERVAL_SECONDS und zusätzlich direkt nach Mitternacht (UTC).
+SCHEDULER_ENABLED = os.getenv("PUTZPLAN_SCHEDULER", "1") == "1"
+SCHEDULER_INTERVAL_SECONDS = int(os.getenv("PUTZPLAN_SCHEDULER_INTERVAL_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+_runner: Optional[asyncio.Task] = None
+
+
+def seconds_until_next_run(now: datetime, interval: int = SCHEDULER_INTERVAL_SECONDS) -> float:
+    next_midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    # +1s, damit der Lauf sicher schon im neuen Tag landet
+    return max(min(interval, (next_midnight - now).total_seconds() + 1), 1)
+
+
+async def _run_forever(job: Callable[[], None]):
+    while True:
+        try:
+            # Job ist sync (DB-Zugriff) -> Threadpool, Event-Loop bleibt frei
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception("Scheduler-Lauf fehlgeschlagen")
+        await asyncio.sleep(seconds_until_next_run(datetime.utcnow()))
+
+
+def start_scheduler(job: Callable[[], None]):
+    global _runner
+    if not SCHEDULER_ENABLED or _runner is not None:
+        return
+    _runner = asyncio.get_running_loop().create_task(_run_forever(job))
+
+
+async def stop_scheduler():
+    global _runner
+    if _runner is None:
+        return
+    _runner.cancel()
+    try:
+        await _runner
+    except asyncio.CancelledError:
+        pass
+    _runner = None
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.schemas import TaskRead, UserRead
+from app.utils.tenants import current_tenant
+
+
+# Schneller Antwortpfad: einmal mit vorkompiliertem TypeAdapter validieren und direkt
+# (pydantic-core) nach JSON-Bytes serialisieren. Die Route gibt eine fertige Response
+# zurück, FastAPI validiert/encodiert dann nicht noch einmal gegen response_model.
+TASK_ADAPTER = TypeAdapter(TaskRead)
+TASK_LIST_ADAPTER = TypeAdapter(List[TaskRead])
+USER_LIST_ADAPTER = TypeAdapter(List[UserRead])
+
+RESPONSE_CACHE_SIZE = 64
+
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def json_response(body: bytes, response: Optional[Response] = None) -> Response:
+    """Fertige JSON-Bytes als Response, Header (z.B. ETag) aus der injizierten Response übernehmen."""
+    result = Response(content=body, media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name.lower() != "content-length":
+                result.headers[name] = value
+    return result
+
+
+class ResponseCache:
+    """
+    Kleiner LRU-Cache für fertige Antwort-Bytes. Der Key enthält die Datenversion
+    (app.utils.etag.get_data_version), jeder Schreibzugriff macht alte Einträge damit unerreichbar.
+    Der aktuelle Tenant wird automatisch vor den Key gesetzt.
+    """
+
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        key = (current_tenant.get(), key)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Hashable, body: bytes):
+        key = (current_tenant.get(), key)
+        with self._lock:
+            self._entries[key] = body
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+task_list_cache = ResponseCache()
+user_list_cache = ResponseCache()
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.metrics import UNTIMED_ROUTES, _route_label
+from app.utils.tenants import current_tenant
+
+
+# Strukturiertes JSON-Log nur für langsame Statements/Requests (statt set_logging_sql(DEBUG)).
+# Beim ersten Auftreten einer langsamen Statement-Form wird zusätzlich EXPLAIN QUERY PLAN mitgeloggt.
+SLOW_LOG_ENABLED = os.getenv("PUTZPLAN_SLOW_LOG", "1") == "1"
+SLOW_QUERY_MS = float(os.getenv("PUTZPLAN_SLOW_QUERY_MS", "100"))
+SLOW_REQUEST_MS = float(os.getenv("PUTZPLAN_SLOW_REQUEST_MS", "500"))
+MAX_EXPLAINED_SHAPES = 1000
+
+logger = logging.getLogger("putzplan.slow")
+
+_explained_lock = threading.Lock()
+_explained_shapes = set()
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+class _RequestContext:
+    __slots__ = ("scope", "sql_count", "sql_ms")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.sql_count = 0
+        self.sql_ms = 0.0
+
+
+_current_request: ContextVar[Optional[_RequestContext]] = ContextVar("slowlog_request", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {"ts": datetime.utcfromtimestamp(record.created).isoformat() + "Z", "level": record.levelname}
+        payload.update(record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()})
+        return json.dumps(payload, default=str)
+
+
+def configure_slow_log(level: int = logging.WARNING):
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Nur Typen, nie Werte: keine personenbezogenen Daten im Log."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return {"executemany": len(parameters), "row": parameter_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _explain(cursor, statement: str, parameters: Any, executemany: bool) -> Optional[list]:
+    if not _EXPLAINABLE.match(statement):
+        return None
+    with _explained_lock:
+        if statement in _explained_shapes or len(_explained_shapes) >= MAX_EXPLAINED_SHAPES:
+            return None
+        _explained_shapes.add(statement)
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    try:
+        # eigener Cursor auf derselben DBAPI-Connection, das Ergebnis des Originals bleibt unangetastet
+        plan_cursor = cursor.connection.cursor()
+        try:
+            plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return [row[-1] for row in plan_cursor.fetchall()]
+        finally:
+            plan_cursor.close()
+    except Exception as e:  # z.B. async-Adapter ohne direkten Cursor-Zugriff
+        return [f"explain failed: {e}"]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if SLOW_LOG_ENABLED:
+        conn.info.setdefault("slowlog_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("slowlog_query_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    request = _current_request.get()
+    if request is not None:
+        request.sql_count += 1
+        request.sql_ms += elapsed_ms
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+
+    entry: Dict[str, Any] = {
+        "type": "slow_query",
+        "ms": round(elapsed_ms, 2),
+        "route": _route_label(request.scope) if request else None,
+        "tenant": current_tenant.get(),
+        "statement": statement,
+        "params": parameter_shape(parameters),
+        "rows": cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None,
+    }
+    plan = _explain(cursor, statement, parameters, executemany)
+    if plan is not None:
+        entry["plan"] = plan
+    logger.warning(entry)
+
+
+class SlowRequestMiddleware:
+    """Loggt Requests über SLOW_REQUEST_MS inkl. Anzahl/Zeit der SQL-Statements."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request = _RequestContext(scope)
+        token = _current_request.set(request)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            _current_request.reset(token)
+            route = _route_label(scope)
+            if elapsed_ms >= SLOW_REQUEST_MS and route not in UNTIMED_ROUTES:
+                logger.warning({
+                    "type": "slow_request",
+                    "ms": round(elapsed_ms, 2),
+                    "method": scope["method"],
+                    "route": route,
+                    "path": scope["path"],
+                    "tenant": current_tenant.get(),
+                    "status": status["code"],
+                    "sql_count": request.sql_count,
+                    "sql_ms": round(request.sql_ms, 2),
+                })
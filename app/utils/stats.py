@@ -0,0 +1,195 @@
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import load_only
+from sqlmodel import Session, select
+
+from app.models import TaskDailyStats, TaskLog, UserDailyStats
+
+
+# TaskLog.action ist Freitext ("assigned_to_5", "blacklist_added_3", ...).
+# Beim Schreiben wird daraus event/target_user_id, und Logs, die für Statistiken zählen,
+# landen in derselben Transaktion in den Tages-Rollups. Alte Logs (aggregated=False)
+# holt catch_up_stats nach. Undo/Redo rechnet die Logs der betroffenen Versionen
+# (TaskLog.task_version) wieder heraus bzw. hinein, wie die Credits im Ledger.
+_ACTION_PATTERNS = (
+    (re.compile(r"^assigned_to_(\d+)$"), "assigned"),
+    (re.compile(r"^blacklist_added_(\d+)$"), "blacklist_added"),
+    (re.compile(r"^blacklist_removed_(\d+)$"), "blacklist_removed"),
+)
+ESCALATION_EVENTS = ("escalated", "auto_escalated")
+CATCH_UP_BATCH_SIZE = 1000
+
+
+def parse_action(action: str) -> Tuple[str, Optional[int]]:
+    for pattern, event in _ACTION_PATTERNS:
+        match = pattern.match(action)
+        if match:
+            return event, int(match.group(1))
+    return action.replace(" ", "_"), None
+
+
+def _upsert(session: Session, model, keys: Dict[str, Any], increments: Dict[str, int]):
+    stmt = insert(model).values(**keys, **increments)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + amount for column, amount in increments.items()},
+    ))
+
+
+def _apply_log(session: Session, log: TaskLog, sign: int):
+    day = log.timestamp.date()
+    if log.event == "done":
+        lateness = log.value or 0
+        _upsert(session, TaskDailyStats, {"day": day, "task_id": log.task_id}, {
+            "completions": sign,
+            "late_completions": sign if lateness > 0 else 0,
+            "lateness_days_total": sign * lateness,
+        })
+        if log.user_id is not None:
+            _upsert(session, UserDailyStats, {"day": day, "user_id": log.user_id}, {"completions": sign})
+    elif log.event in ESCALATION_EVENTS:
+        _upsert(session, TaskDailyStats, {"day": day, "task_id": log.task_id}, {"escalations": sign})
+
+
+def aggregate_log(session: Session, log: TaskLog):
+    """Einen strukturierten Log-Eintrag in die Tages-Rollups einrechnen (ohne Commit)."""
+    _apply_log(session, log, 1)
+    log.aggregated = True
+
+
+def _versioned_logs(session: Session, task_id: int, reverted: bool, from_version: int, to_version: Optional[int] = None):
+    stmt = select(TaskLog).where(
+        TaskLog.task_id == task_id,
+        TaskLog.aggregated == True,
+        TaskLog.reverted == reverted,
+        TaskLog.task_version >= from_version,
+    )
+    if to_version is not None:
+        stmt = stmt.where(TaskLog.task_version < to_version)
+    return session.exec(stmt).all()
+
+
+def reverse_task_stats(session: Session, task_id: int, from_version: int) -> int:
+    """
+    Undo, Gegenstück zu reverse_task_credits: Logs der Änderungen ab from_version aus den Rollups
+    herausrechnen (am Tag des Logs). Gibt die Anzahl der Logs zurück.
+    """
+    logs = _versioned_logs(session, task_id, False, from_version)
+    for log in logs:
+        _apply_log(session, log, -1)
+        log.reverted = True
+        session.add(log)
+    return len(logs)
+
+
+def restore_task_stats(session: Session, task_id: int, from_version: int, to_version: int) -> int:
+    """Redo: Logs der Versionen from_version <= v < to_version wieder einrechnen."""
+    logs = _versioned_logs(session, task_id, True, from_version, to_version)
+    for log in logs:
+        _apply_log(session, log, 1)
+        log.reverted = False
+        session.add(log)
+    return len(logs)
+
+
+def discard_redo_stats(session: Session, task_id: int, from_version: int) -> int:
+    """
+    Neue Änderung nach einem Undo: die Versionsnummern ab from_version werden neu vergeben.
+    Die herausgerechneten Logs des alten Zweigs bleiben draußen und hängen an keiner Version mehr.
+    """
+    result = session.execute(
+        update(TaskLog)
+        .where(TaskLog.task_id == task_id, TaskLog.task_version >= from_version)
+        .values(task_version=None)
+    )
+    return result.rowcount or 0
+
+
+def catch_up_stats(session: Session, batch_size: int = CATCH_UP_BATCH_SIZE, limit: Optional[int] = None) -> int:
+    """
+    Noch nicht eingerechnete Logs (alte Datenbanken, Importe) strukturieren und aggregieren.
+    Arbeitet in Batches über den Index auf aggregated; Commit macht der Aufrufer.
+    Mit limit hört es nach etwa so vielen Logs auf (Migrationen committen dazwischen).
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        logs = session.exec(
+            select(TaskLog)
+            # nur was aggregate_log braucht: läuft auch als Migration, bevor spätere Spalten existieren
+            .options(load_only(
+                TaskLog.id, TaskLog.task_id, TaskLog.user_id, TaskLog.action, TaskLog.timestamp,
+                TaskLog.event, TaskLog.target_user_id, TaskLog.value, TaskLog.aggregated,
+            ))
+            .where(TaskLog.aggregated == False)
+            .order_by(TaskLog.id)
+            .limit(batch_size)
+        ).all()
+        if not logs:
+            return processed
+        for log in logs:
+            if log.event is None:
+                log.event, log.target_user_id = parse_action(log.action)
+            aggregate_log(session, log)
+            session.add(log)
+        session.flush()
+        processed += len(logs)
+    return processed
+
+
+def iso_week(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def build_stats(session: Session, since: date, until: date) -> Dict[str, Any]:
+    """Antwortet nur aus den Rollups: Aufwand hängt vom Zeitfenster ab, nicht von der Log-Länge."""
+    user_rows = session.exec(
+        select(UserDailyStats.user_id, UserDailyStats.day, UserDailyStats.completions)
+        .where(UserDailyStats.day >= since, UserDailyStats.day <= until)
+    ).all()
+    user_weekly: Dict[Tuple[int, str], int] = {}
+    for user_id, day, completions in user_rows:
+        key = (user_id, iso_week(day))
+        user_weekly[key] = user_weekly.get(key, 0) + completions
+
+    task_rows = session.exec(
+        select(
+            TaskDailyStats.task_id,
+            func.sum(TaskDailyStats.completions),
+            func.sum(TaskDailyStats.late_completions),
+            func.sum(TaskDailyStats.lateness_days_total),
+            func.sum(TaskDailyStats.escalations),
+        )
+        .where(TaskDailyStats.day >= since, TaskDailyStats.day <= until)
+        .group_by(TaskDailyStats.task_id)
+    ).all()
+    weeks = max(((until - since).days + 1) / 7, 1 / 7)
+
+    tasks: List[Dict[str, Any]] = []
+    for task_id, completions, late, lateness_total, escalations in task_rows:
+        tasks.append({
+            "task_id": task_id,
+            "completions": completions,
+            "late_completions": late,
+            "avg_lateness_days": round(lateness_total / completions, 2) if completions else None,
+            "escalations": escalations,
+            "escalations_per_week": round(escalations / weeks, 2),
+        })
+
+    return {
+        "from": since,
+        "until": until,
+        "user_weekly": [
+            {"user_id": user_id, "week": week, "completions": completions}
+            for (user_id, week), completions in sorted(user_weekly.items(), key=lambda item: (item[0][1], item[0][0]))
+        ],
+        "tasks": tasks,
+    }
+
+
+def stats_window(weeks: int, today: date) -> Tuple[date, date]:
+    return today - timedelta(weeks=weeks) + timedelta(days=1), today
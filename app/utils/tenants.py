@@ -0,0 +1,95 @@
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi.responses import JSONResponse
+
+
+# Mehrere WGs in einem Prozess: jede WG (Tenant) hat ihre eigene SQLite-Datei
+# PUTZPLAN_TENANT_DIR/<tenant>.db. Der Tenant kommt je nach PUTZPLAN_TENANT_MODE aus
+#   header:    X-Putzplan-Tenant: <tenant>
+#   subdomain: <tenant>.putzplan.example
+#   path:      /t/<tenant>/api/...  (Präfix wird vor dem Routing entfernt)
+# "off" (Default) oder kein Tenant im Request -> die normale Datenbank (PUTZPLAN_DB_PATH).
+TENANT_MODE = os.getenv("PUTZPLAN_TENANT_MODE", "off")
+TENANT_DIR = os.getenv("PUTZPLAN_TENANT_DIR", "tenants")
+TENANT_HEADER = os.getenv("PUTZPLAN_TENANT_HEADER", "X-Putzplan-Tenant")
+# Unbekannte Tenants automatisch anlegen? Sonst muss <tenant>.db vorher existieren (touch reicht).
+TENANT_AUTO_CREATE = os.getenv("PUTZPLAN_TENANT_AUTO_CREATE", "0") == "1"
+
+_TENANT_NAME = re.compile(r"^[a-z0-9][a-z0-9-]{0,62}$")
+_PATH_PREFIX = re.compile(r"^/t/([^/]+)(/.*)?$")
+
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+
+def tenant_db_path(tenant: str) -> str:
+    return os.path.join(TENANT_DIR, f"{tenant}.db")
+
+
+def known_tenants() -> List[str]:
+    if not os.path.isdir(TENANT_DIR):
+        return []
+    return sorted(name[:-3] for name in os.listdir(TENANT_DIR) if name.endswith(".db") and _TENANT_NAME.match(name[:-3]))
+
+
+@contextmanager
+def tenant_context(tenant: Optional[str]):
+    """Für Code außerhalb eines Requests (Scheduler, Startup)."""
+    token = current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def _header(scope, name: str) -> Optional[str]:
+    wanted = name.lower().encode()
+    for key, value in scope.get("headers", []):
+        if key == wanted:
+            return value.decode("latin-1")
+    return None
+
+
+def resolve_tenant(scope) -> Optional[str]:
+    """Tenant-Name aus dem Request; im path-Modus wird der Präfix aus scope entfernt."""
+    if TENANT_MODE == "header":
+        return _header(scope, TENANT_HEADER)
+    if TENANT_MODE == "subdomain":
+        host = (_header(scope, "host") or "").split(":")[0]
+        labels = host.split(".")
+        return labels[0] if len(labels) > 2 else None
+    if TENANT_MODE == "path":
+        match = _PATH_PREFIX.match(scope["path"])
+        if not match:
+            return None
+        scope["path"] = match.group(2) or "/"
+        scope["root_path"] = scope.get("root_path", "") + f"/t/{match.group(1)}"
+        return match.group(1)
+    return None
+
+
+class TenantMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or TENANT_MODE == "off":
+            return await self.app(scope, receive, send)
+
+        # scope wird bewusst in-place geändert (path-Modus), damit äußere Middleware die Route sieht
+        tenant = resolve_tenant(scope)
+        if tenant is not None:
+            tenant = tenant.lower()
+            if not _TENANT_NAME.match(tenant):
+                return await JSONResponse({"detail": "Invalid household"}, status_code=400)(scope, receive, send)
+            if not TENANT_AUTO_CREATE and not os.path.exists(tenant_db_path(tenant)):
+                return await JSONResponse({"detail": "Unknown household"}, status_code=404)(scope, receive, send)
+
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
@@ -1,24 +1,41 @@
-from datetime import datetime
+from typing import Any, Dict
+
+from pydantic import TypeAdapter
 from sqlmodel import Session
-from typing import Any
 
-def apply_task_version(task, version_obj, session: Session):
+from app.models import Task
+
+
+# Codec für TaskVersion-Snapshots, abgeleitet aus den Feldtypen von Task:
+# datetime-Felder werden zu ISO-Strings und zurück, TaskType zu seinem Wert, alles andere bleibt.
+# Nur Felder mit Datumstyp werden als Datum gelesen, ein Titel mit "T" bleibt ein String.
+# id und der Undo-Pointer gehören nicht zum Stand einer Aufgabe.
+SNAPSHOT_EXCLUDED_FIELDS = {"id", "undo_pointer"}
+
+_FIELD_ADAPTERS: Dict[str, TypeAdapter] = {
+    name: TypeAdapter(field.annotation)
+    for name, field in Task.model_fields.items()
+    if name not in SNAPSHOT_EXCLUDED_FIELDS
+}
+
+
+def encode_task(task: Task) -> Dict[str, Any]:
+    """Task -> JSON-fähiger Snapshot für TaskVersion.data."""
+    return {name: adapter.dump_python(getattr(task, name), mode="json") for name, adapter in _FIELD_ADAPTERS.items()}
+
+
+def decode_task_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot -> Python-Werte; Felder, die es im Model nicht mehr gibt, fallen weg."""
+    return {name: _FIELD_ADAPTERS[name].validate_python(value) for name, value in data.items() if name in _FIELD_ADAPTERS}
+
+
+def apply_task_version(task, data: dict[str, Any], session: Session):
     """
-    Überträgt die gespeicherten Felder aus einer TaskVersion zurück auf das Task-Objekt.
-    Unterstützt automatische Konvertierung von ISO-Strings in datetime.
+    Überträgt einen (rekonstruierten) TaskVersion-Snapshot zurück auf das Task-Objekt.
+    Die Werte werden über die Feldtypen von Task dekodiert.
     """
-    data: dict[str, Any] = version_obj.data
-
-    for key, value in data.items():
-        if hasattr(task, key):
-            # Optional: ISO8601-String zu datetime
-            if isinstance(value, str) and "T" in value:
-                try:
-                    value = datetime.fromisoformat(value)
-                except ValueError:
-                    pass  # kein gültiges Datum, lass es als String
-            setattr(task, key, value)
+    for key, value in decode_task_data(data).items():
+        setattr(task, key, value)
 
+    # Commit macht die Route (eine Transaktion pro Request)
     session.add(task)
-    session.commit()
-    session.refresh(task)
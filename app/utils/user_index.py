@@ -0,0 +1,77 @@
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SASession
+from sqlmodel import Session, select
+
+from app.models import User
+from app.utils.tenants import current_tenant
+
+
+# Prozessweiter Index der aktiven User-IDs.
+# Wird nach jedem Commit, der User angefasst hat, invalidiert und beim nächsten
+# Zugriff mit einer einzigen Query neu geladen.
+# Im Multi-WG-Modus ein Index pro Tenant.
+_lock = threading.Lock()
+_generations: Dict[Optional[str], int] = {}
+_caches: Dict[Optional[str], Tuple[int, FrozenSet[int]]] = {}
+
+
+def invalidate_user_index():
+    tenant = current_tenant.get()
+    with _lock:
+        _generations[tenant] = _generations.get(tenant, 0) + 1
+        _caches.pop(tenant, None)
+
+
+def _lookup() -> Tuple[Optional[FrozenSet[int]], int]:
+    tenant = current_tenant.get()
+    with _lock:
+        cached = _caches.get(tenant)
+        generation = _generations.get(tenant, 0)
+    if cached is not None and cached[0] == generation:
+        return cached[1], generation
+    return None, generation
+
+
+def _store(generation: int, active_ids: FrozenSet[int]):
+    tenant = current_tenant.get()
+    with _lock:
+        # Nur speichern, wenn zwischenzeitlich niemand invalidiert hat
+        if generation == _generations.get(tenant, 0):
+            _caches[tenant] = (generation, active_ids)
+
+
+def get_active_user_ids(session: Session) -> FrozenSet[int]:
+    active_ids, generation = _lookup()
+    if active_ids is None:
+        active_ids = frozenset(session.exec(select(User.id).where(User.active == True)).all())
+        _store(generation, active_ids)
+    return active_ids
+
+
+async def get_active_user_ids_async(reader) -> FrozenSet[int]:
+    """Wie get_active_user_ids, aber für die async Lese-Session aus get_read_session."""
+    active_ids, generation = _lookup()
+    if active_ids is None:
+        active_ids = frozenset(await reader.all(select(User.id).where(User.active == True)))
+        _store(generation, active_ids)
+    return active_ids
+
+
+@event.listens_for(SASession, "after_flush")
+def _track_user_changes(session, flush_context):
+    if any(isinstance(obj, User) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["user_index_dirty"] = True
+
+
+@event.listens_for(SASession, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("user_index_dirty", False):
+        invalidate_user_index()
+
+
+@event.listens_for(SASession, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("user_index_dirty", None)
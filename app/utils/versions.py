@@ -0,0 +1,166 @@
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.orm.attributes import flag_modified
+from sqlmodel import Session, select
+
+from app.models import TaskVersion
+
+
+# TaskVersion speichert nur noch geänderte Felder (Delta) gegenüber der Vorversion.
+# Alle KEYFRAME_INTERVAL Versionen wird ein voller Snapshot (Keyframe) geschrieben,
+# damit die Rekonstruktion nie mehr als KEYFRAME_INTERVAL Zeilen braucht.
+KEYFRAME_INTERVAL = int(os.getenv("PUTZPLAN_VERSION_KEYFRAME_INTERVAL", "20"))
+# Wie viele Versionen pro Task beim Kompaktieren behalten werden
+VERSION_RETENTION = int(os.getenv("PUTZPLAN_VERSION_RETENTION", "200"))
+
+
+def load_version_chain(session: Session, task_id: int, up_to_version: Optional[int] = None) -> List[TaskVersion]:
+    """Letzter Keyframe <= up_to_version plus alle Deltas danach, aufsteigend sortiert."""
+    keyframe_stmt = (
+        select(TaskVersion.version)
+        .where(TaskVersion.task_id == task_id, TaskVersion.is_keyframe == True)
+        .order_by(TaskVersion.version.desc())
+        .limit(1)
+    )
+    if up_to_version is not None:
+        keyframe_stmt = keyframe_stmt.where(TaskVersion.version <= up_to_version)
+    keyframe_version = session.exec(keyframe_stmt).first()
+    if keyframe_version is None:
+        return []
+
+    stmt = (
+        select(TaskVersion)
+        .where(TaskVersion.task_id == task_id, TaskVersion.version >= keyframe_version)
+        .order_by(TaskVersion.version)
+    )
+    if up_to_version is not None:
+        stmt = stmt.where(TaskVersion.version <= up_to_version)
+    return list(session.exec(stmt).all())
+
+
+def apply_version_data(state: Optional[Dict[str, Any]], version: TaskVersion) -> Dict[str, Any]:
+    if version.is_keyframe or state is None:
+        return dict(version.data or {})
+    merged = dict(state)
+    merged.update(version.data or {})
+    return merged
+
+
+def reconstruct_task_data(session: Session, task_id: int, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Voller Snapshot einer Version (ohne version: die neueste)."""
+    state = None
+    for row in load_version_chain(session, task_id, version):
+        state = apply_version_data(state, row)
+    return state
+
+
+def materialize_versions(rows: Iterable[TaskVersion]) -> List[TaskVersion]:
+    """
+    Wandelt nach (task_id, version) aufsteigend sortierte Zeilen in Versionen mit vollen Snapshots um.
+    Die Zeilen müssen pro Task mit einem Keyframe beginnen.
+    """
+    states: Dict[int, Dict[str, Any]] = {}
+    result = []
+    for row in rows:
+        state = apply_version_data(states.get(row.task_id), row)
+        states[row.task_id] = state
+        full = row.model_dump()
+        full["data"] = state
+        full["is_keyframe"] = True
+        result.append(TaskVersion.model_validate(full))
+    return result
+
+
+def load_recent_versions(session: Session, task_id: int, limit: int) -> List[TaskVersion]:
+    """Die neuesten `limit` Versionen eines Tasks als volle Snapshots, neueste zuerst."""
+    recent = session.exec(
+        select(TaskVersion.version)
+        .where(TaskVersion.task_id == task_id)
+        .order_by(TaskVersion.version.desc())
+        .limit(limit)
+    ).all()
+    if not recent:
+        return []
+
+    oldest = recent[-1]
+    keyframe_version = session.exec(
+        select(TaskVersion.version)
+        .where(TaskVersion.task_id == task_id, TaskVersion.is_keyframe == True, TaskVersion.version <= oldest)
+        .order_by(TaskVersion.version.desc())
+        .limit(1)
+    ).first()
+    if keyframe_version is None:
+        keyframe_version = oldest
+
+    rows = session.exec(
+        select(TaskVersion)
+        .where(TaskVersion.task_id == task_id, TaskVersion.version >= keyframe_version)
+        .order_by(TaskVersion.version)
+    ).all()
+    return [v for v in reversed(materialize_versions(rows)) if v.version >= oldest]
+
+
+def version_bounds(session: Session, task_id: int) -> Tuple[Optional[int], Optional[int]]:
+    """Älteste und neueste gespeicherte Version eines Tasks (ein Lookup über den (task_id, version)-Index)."""
+    return session.exec(
+        select(func.min(TaskVersion.version), func.max(TaskVersion.version)).where(TaskVersion.task_id == task_id)
+    ).one()
+
+
+def discard_versions_after(session: Session, task_id: int, version: int) -> int:
+    """Redo-Zweig verwerfen: nach einem Undo beginnt eine neue Änderung die Historie ab hier neu."""
+    result = session.execute(delete(TaskVersion).where(TaskVersion.task_id == task_id, TaskVersion.version > version))
+    return result.rowcount or 0
+
+
+def build_version_row(session: Session, task_id: int, version: int, snapshot: Dict[str, Any], **fields) -> TaskVersion:
+    """Erzeugt die nächste TaskVersion als Delta oder (alle KEYFRAME_INTERVAL Versionen) als Keyframe."""
+    chain = load_version_chain(session, task_id)
+    previous = None
+    for row in chain:
+        previous = apply_version_data(previous, row)
+
+    if previous is None or len(chain) >= KEYFRAME_INTERVAL:
+        return TaskVersion(task_id=task_id, version=version, is_keyframe=True, data=snapshot, **fields)
+
+    delta = {key: value for key, value in snapshot.items() if previous.get(key) != value}
+    return TaskVersion(task_id=task_id, version=version, is_keyframe=False, data=delta, **fields)
+
+
+def compact_task_versions(session: Session, keep: int = VERSION_RETENTION) -> int:
+    """
+    Retention: pro Task nur die neuesten `keep` Versionen behalten.
+    Die älteste behaltene Version wird zum Keyframe, alles davor gelöscht.
+    Gibt die Anzahl gelöschter Zeilen zurück (Commit macht der Aufrufer).
+    """
+    keep = max(keep, 1)
+    over_limit = session.exec(
+        select(TaskVersion.task_id)
+        .group_by(TaskVersion.task_id)
+        .having(func.count(TaskVersion.id) > keep)
+    ).all()
+
+    removed = 0
+    for task_id in over_limit:
+        cutoff = session.exec(
+            select(TaskVersion)
+            .where(TaskVersion.task_id == task_id)
+            .order_by(TaskVersion.version.desc())
+            .offset(keep - 1)
+            .limit(1)
+        ).first()
+
+        if not cutoff.is_keyframe:
+            cutoff.data = reconstruct_task_data(session, task_id, cutoff.version)
+            cutoff.is_keyframe = True
+            flag_modified(cutoff, "data")
+            session.add(cutoff)
+            session.flush()
+
+        result = session.execute(
+            delete(TaskVersion).where(TaskVersion.task_id == task_id, TaskVersion.version < cutoff.version)
+        )
+        removed += result.rowcount or 0
+    return removed
@@ -0,0 +1,144 @@
+"""
+Benchmark der API-Hot-Paths, in-process über den ASGI-TestClient.
+
+    python -m bench.bench_api [--users 20] [--tasks 1000] [--logs-per-task 20] [--versions-per-task 10]
+                              [--requests 200] [--output result.json] [--compare baseline.json]
+
+Befüllt eine temporäre SQLite-DB (PUTZPLAN_DB_PATH) und misst pro Endpoint Latenz-Perzentile,
+SQL-Statements pro Request und Durchsatz. Ausgabe ist JSON (inkl. Git-Revision und Seed-Konfiguration),
+damit sich Läufe verschiedener Commits vergleichen lassen; --compare zeigt die Änderung von p50/p99.
+"""
+import argparse
+import json
+import sys
+import time
+
+from bench.common import SqlCounter, git_revision, percentiles, prepare_environment, seed_database
+
+
+def build_scenarios(client, ids):
+    """Name -> (Vorbereitung, nicht gemessen; Request, gemessen)."""
+    from app.utils.etag import bump_data_version
+
+    rotating = ids["rotating_task_ids"]
+    state = {"i": 0}
+
+    def next_rotating():
+        state["i"] += 1
+        return rotating[state["i"] % len(rotating)]
+
+    def noop():
+        pass
+
+    return {
+        # nach einem Schreibzugriff: Response-Cache verfehlt
+        "list_tasks": (bump_data_version, lambda: client.get("/api/tasks/")),
+        "list_tasks_cached": (noop, lambda: client.get("/api/tasks/")),
+        "list_tasks_filtered": (bump_data_version, lambda: client.get("/api/tasks/?urgency=red&sort=due")),
+        "dashboard": (bump_data_version, lambda: client.get("/api/dashboard")),
+        "mark_done": (noop, lambda: client.patch(f"/api/tasks/{next_rotating()}/done")),
+        "next_recurring_user": (noop, lambda: client.get(f"/api/users/{next_rotating()}/next-recurring-user")),
+        "queue_active": (noop, lambda: client.get(f"/api/tasks/queue/{next_rotating()}/active")),
+        "list_logs": (noop, lambda: client.get("/api/logs/?limit=100")),
+        "list_logs_by_task": (noop, lambda: client.get(f"/api/logs/?limit=100&task_id={next_rotating()}")),
+        "task_versions": (noop, lambda: client.get(f"/api/tasks/versions/{next_rotating()}")),
+    }
+
+
+def run_scenario(prepare, request, counter, requests, warmup):
+    for _ in range(warmup):
+        prepare()
+        request()
+
+    samples = []
+    queries = 0
+    errors = 0
+    busy = 0.0
+    for _ in range(requests):
+        prepare()
+        before = counter.count
+        start = time.perf_counter()
+        response = request()
+        elapsed = time.perf_counter() - start
+        queries += counter.count - before
+        busy += elapsed
+        samples.append(elapsed * 1000)
+        if response.status_code >= 400:
+            errors += 1
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        **percentiles(samples),
+        "sql_per_request": round(queries / requests, 2),
+        "throughput_rps": round(requests / busy, 1) if busy else None,
+    }
+
+
+def compare(result, baseline):
+    lines = []
+    for name, current in result["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for key in ("p50_ms", "p99_ms", "sql_per_request"):
+            if previous.get(key):
+                change = (current[key] - previous[key]) / previous[key] * 100
+                lines.append(f"{name:24} {key:16} {previous[key]:>10} -> {current[key]:>10} ({change:+.1f}%)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark der API-Hot-Paths")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--logs-per-task", type=int, default=20)
+    parser.add_argument("--versions-per-task", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="nur diese Endpoints messen")
+    parser.add_argument("--output", help="JSON zusätzlich in diese Datei schreiben")
+    parser.add_argument("--compare", help="früheres Ergebnis-JSON zum Vergleich")
+    args = parser.parse_args(argv)
+
+    prepare_environment()
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.enums import TaskType
+    from app.main import app
+    from app.models import Task
+
+    seeded = seed_database(args.users, args.tasks, args.logs_per_task, args.versions_per_task)
+    with Session(engine) as session:
+        rotating = session.exec(select(Task.id).where(Task.task_type == TaskType.assigned)).all()
+
+    counter = SqlCounter()
+    endpoints = {}
+    with TestClient(app) as client:
+        scenarios = build_scenarios(client, {"rotating_task_ids": list(rotating)})
+        for name, (prepare, request) in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            endpoints[name] = run_scenario(prepare, request, counter, args.requests, args.warmup)
+
+    result = {
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "seed": seeded,
+        "endpoints": endpoints,
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.stdout.write(output + "\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.stderr.write(compare(result, json.load(f)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Vorher/Nachher-Messung für den Serialisierungspfad von GET /api/tasks/.
+
+    python -m bench.bench_serialization [--sizes 1000 10000] [--repeat 20]
+
+Legt eine temporäre DB an (PUTZPLAN_DB_PATH), befüllt sie mit N Tasks und misst pro Größe:
+- legacy:  Dicts -> response_model-Validierung -> jsonable_encoder -> json.dumps (bisheriger FastAPI-Pfad)
+- adapter: Dicts -> TypeAdapter.validate_python -> dump_json (neuer Pfad)
+- endpoint_cold / endpoint_cached: GET /api/tasks/ über TestClient ohne bzw. mit Response-Cache
+Ausgabe als JSON (Median in ms).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from bench.common import prepare_environment
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run(sizes, repeat):
+    prepare_environment()
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.main import app
+    from app.models import Task
+    from app.utils.due_state import build_task_read
+    from app.utils.due_state import refresh_due_state
+    from app.schemas import TaskRead
+    from app.utils.etag import bump_data_version
+    from app.utils.serialization import TASK_LIST_ADAPTER, dump_json, task_list_cache
+
+    results = []
+    with TestClient(app) as client:
+        seeded = 0
+        for size in sorted(sizes):
+            with Session(engine) as session:
+                for i in range(seeded, size):
+                    task = Task(title=f"Task {i}", default_duration_days=1 + i % 14, blacklist=[i % 5])
+                    refresh_due_state(task)
+                    session.add(task)
+                session.commit()
+                seeded = size
+                data = [build_task_read(task) for task in session.exec(select(Task)).all()]
+
+            def legacy():
+                models = [TaskRead.model_validate(item) for item in data]
+                json.dumps(jsonable_encoder(models)).encode("utf-8")
+
+            def adapter():
+                dump_json(TASK_LIST_ADAPTER, data)
+
+            def endpoint_cold():
+                task_list_cache.clear()
+                bump_data_version()
+                assert client.get("/api/tasks/").status_code == 200
+
+            def endpoint_cached():
+                assert client.get("/api/tasks/").status_code == 200
+
+            results.append({
+                "tasks": size,
+                "legacy_ms": median_ms(legacy, repeat),
+                "adapter_ms": median_ms(adapter, repeat),
+                "endpoint_cold_ms": median_ms(endpoint_cold, repeat),
+                "endpoint_cached_ms": median_ms(endpoint_cached, repeat),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sys.stdout.write(json.dumps(run(args.sizes, args.repeat), indent=2) + "\n")
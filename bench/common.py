@@ -0,0 +1,146 @@
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+
+def prepare_environment() -> str:
+    """
+    Temporäre DB über PUTZPLAN_DB_PATH, Scheduler aus. Muss vor dem ersten Import von app.* laufen,
+    weil app.database die Engine beim Import anlegt.
+    """
+    workdir = tempfile.mkdtemp(prefix="putzplan-bench-")
+    os.environ["PUTZPLAN_DB_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ.setdefault("PUTZPLAN_SCHEDULER", "0")
+    return workdir
+
+
+def seed_database(users: int, tasks: int, logs_per_task: int, versions_per_task: int, seed: int = 42) -> Dict[str, int]:
+    """User, rotierende Tasks mit Queue, Logs und Versionen (Keyframes + Deltas) per Bulk-Insert anlegen."""
+    from sqlalchemy import insert
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.enums import TaskType
+    from app.migrations import run_migrations
+    from app.models import AssignmentQueue, Task, TaskLog, TaskVersion, User
+    from app.utils.due_state import refresh_due_state
+    from app.utils.undo import encode_task
+    from app.utils.versions import KEYFRAME_INTERVAL
+
+    rng = random.Random(seed)
+    run_migrations(engine)
+    now = datetime.utcnow()
+
+    with Session(engine) as session:
+        session.execute(insert(User), [{"name": f"User {i}", "active": i % 10 != 9} for i in range(users)])
+        user_ids = list(session.exec(select(User.id)).all())
+
+        task_rows = []
+        for i in range(tasks):
+            task = Task(
+                title=f"Task {i}",
+                task_type=TaskType.assigned if i % 2 == 0 else TaskType.free,
+                default_duration_days=1 + i % 14,
+                credits=1 + i % 3,
+                created_at=now - timedelta(days=rng.randint(0, 30)),
+                user_id=rng.choice(user_ids) if i % 2 == 0 and user_ids else None,
+                blacklist=rng.sample(user_ids, min(2, len(user_ids))) if i % 7 == 0 else [],
+                iteration=versions_per_task,
+            )
+            refresh_due_state(task)
+            task_rows.append(task)
+        session.add_all(task_rows)
+        session.flush()
+
+        queues = []
+        for task in task_rows:
+            queue_list = list(user_ids)
+            rng.shuffle(queue_list)
+            cursor = queue_list.index(task.user_id) if task.user_id in queue_list else 0
+            queues.append({"task_id": task.id, "user_queue": queue_list, "cursor": cursor})
+        if queues:
+            session.execute(insert(AssignmentQueue), queues)
+
+        log_rows = []
+        version_rows = []
+        for task in task_rows:
+            for n in range(logs_per_task):
+                log_rows.append({
+                    "task_id": task.id,
+                    "user_id": rng.choice(user_ids) if user_ids else None,
+                    "action": rng.choice(("done", "updated", "escalated", "queue_shuffled")),
+                    "event": None,
+                    "timestamp": now - timedelta(minutes=n * 37),
+                    "aggregated": True,
+                })
+            snapshot = encode_task(task)
+            for version in range(1, versions_per_task + 1):
+                keyframe = (version - 1) % KEYFRAME_INTERVAL == 0
+                version_rows.append({
+                    "task_id": task.id,
+                    "version": version,
+                    "action": "seed",
+                    "timestamp": now,
+                    "is_keyframe": keyframe,
+                    "data": {**snapshot, "iteration": version} if keyframe else {"iteration": version},
+                })
+        for rows, model in ((log_rows, TaskLog), (version_rows, TaskVersion)):
+            for start in range(0, len(rows), 5000):
+                session.execute(insert(model), rows[start:start + 5000])
+        session.commit()
+
+    return {
+        "users": users,
+        "tasks": tasks,
+        "queue_entries": tasks * users,
+        "logs": len(log_rows),
+        "versions": len(version_rows),
+    }
+
+
+class SqlCounter:
+    """Zählt SQL-Statements über Engine-Events (sync-Engine und, falls aktiv, async-Engine)."""
+
+    def __init__(self):
+        from sqlalchemy import event
+
+        from app import database
+
+        self.count = 0
+        self._engines = [database.engine]
+        if database.async_engine is not None:
+            self._engines.append(database.async_engine.sync_engine)
+        for db_engine in self._engines:
+            event.listen(db_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def pick(fraction: float) -> float:
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 3)
+
+    return {
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
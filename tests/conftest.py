@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import pytest
+
+# Vor dem Import der App setzen: DB und Medien im Temp-Verzeichnis, kein Hintergrund-Scheduler
+_TMP_DIR = tempfile.mkdtemp(prefix="putzplan-tests-")
+os.environ.setdefault("PUTZPLAN_DB_PATH", os.path.join(_TMP_DIR, "putzplan.db"))
+os.environ.setdefault("PUTZPLAN_MEDIA_DIR", os.path.join(_TMP_DIR, "media"))
+os.environ.setdefault("PUTZPLAN_SCHEDULER", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.database import get_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.utils.events import publish_event  # noqa: E402
+from app.utils.user_index import invalidate_user_index  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def session():
+    with Session(get_engine()) as s:
+        yield s
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    # sonst erst beim Startup des TestClients
+    run_migrations(get_engine())
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    yield
+    with Session(get_engine()) as s:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            s.execute(table.delete())
+        s.commit()
+    # Caches hängen an der Datenversion bzw. am User-Index
+    publish_event("reset", "tests")
+    invalidate_user_index()
+
+
+def create_user(client, name):
+    response = client.post("/api/users/", json={"name": name})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def create_task(client, **fields):
+    payload = {"title": "Bad putzen", "credits": 3, **fields}
+    response = client.post("/api/tasks/", json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def get_task(client, task_id):
+    tasks = client.get("/api/tasks/").json()
+    return next(task for task in tasks if task["id"] == task_id)
@@ -0,0 +1,81 @@
+import os
+import sqlite3
+
+import pytest
+
+from app.database import current_db_path, get_engine
+from app.migrations import SCHEMA_VERSION
+from app.utils import backup
+from tests.conftest import create_task, create_user, get_task
+
+
+def _import(client, content):
+    return client.post(
+        "/api/backup/import",
+        params={"confirm_1": True, "confirm_2": True},
+        files={"file": ("putzplan.db", content, "application/octet-stream")},
+    )
+
+
+def _user_names(client):
+    return sorted(user["name"] for user in client.get("/api/users/").json())
+
+
+def test_export_import_roundtrip(client):
+    create_user(client, "Anna")
+    task = create_task(client, title="Bad putzen")
+    exported = client.get("/api/backup/export", params={"gzip": True}).content
+
+    create_user(client, "Ben")
+    client.patch(f"/api/tasks/{task['id']}", json={"credits": 9})
+
+    response = _import(client, exported)
+    assert response.status_code == 200, response.text
+    assert _user_names(client) == ["Anna"]
+    assert get_task(client, task["id"])["credits"] == 3
+
+    # Die Sicherung enthält den Stand direkt vor dem Import
+    with sqlite3.connect(f"{current_db_path()}.backup") as conn:
+        assert sorted(row[0] for row in conn.execute("SELECT name FROM user")) == ["Anna", "Ben"]
+
+
+def test_invalid_upload_keeps_database(client):
+    create_user(client, "Anna")
+    response = _import(client, b"keine Datenbank" * 100)
+    assert response.status_code == 400
+    assert _user_names(client) == ["Anna"]
+
+
+def test_newer_schema_is_rejected(client, tmp_path):
+    create_user(client, "Anna")
+    newer = tmp_path / "newer.db"
+    with sqlite3.connect(newer) as conn:
+        conn.execute("CREATE TABLE user (id INTEGER PRIMARY KEY, name VARCHAR)")
+        conn.execute("CREATE TABLE task (id INTEGER PRIMARY KEY)")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    response = _import(client, newer.read_bytes())
+    assert response.status_code == 400
+    assert "neueren Version" in response.json()["detail"]
+    assert _user_names(client) == ["Anna"]
+
+
+def test_failed_restore_rolls_back(client, tmp_path, monkeypatch):
+    create_user(client, "Anna")
+    create_task(client)
+    upload = tmp_path / "upload.db"
+    backup.snapshot_database(get_engine(), str(upload))
+    create_user(client, "Ben")
+
+    table_columns = backup._table_columns
+
+    def failing_after_first_tables(conn, schema):
+        # eine Tabelle, die es nicht gibt: DELETE scheitert, nachdem schon Tabellen geleert wurden
+        return {**table_columns(conn, schema), "gibt_es_nicht": ["id"]}
+
+    monkeypatch.setattr(backup, "_table_columns", failing_after_first_tables)
+    with pytest.raises(sqlite3.OperationalError):
+        backup.restore_database(get_engine(), str(upload), str(tmp_path / "old.backup"))
+
+    assert _user_names(client) == ["Anna", "Ben"]
+    assert len(client.get("/api/tasks/").json()) == 1
+    assert not os.path.exists(f"{upload}-journal")
@@ -0,0 +1,66 @@
+from datetime import date, datetime, timedelta
+
+from sqlmodel import select
+
+from app.models import Task, TaskVersion
+from app.utils import jobs
+from app.utils.jobs import scheduled_due_state_pass
+from tests.conftest import create_task, get_task
+
+
+def _make_overdue(session, task_id):
+    task = session.get(Task, task_id)
+    task.due_at = datetime.utcnow() - timedelta(days=3)
+    session.add(task)
+    session.commit()
+
+
+def test_auto_escalation_is_versioned(client, session):
+    task = create_task(client)
+    _make_overdue(session, task["id"])
+
+    scheduled_due_state_pass()
+
+    escalated = get_task(client, task["id"])
+    assert escalated["escalation_level"] == 1
+    assert escalated["remaining_days"] == 0
+    actions = session.exec(select(TaskVersion.action).where(TaskVersion.task_id == task["id"])).all()
+    assert "auto_escalated" in actions
+
+    # Ein zweiter Lauf eskaliert nicht erneut
+    scheduled_due_state_pass()
+    assert get_task(client, task["id"])["iteration"] == escalated["iteration"]
+
+    assert client.post(f"/api/tasks/undo/{task['id']}").status_code == 200
+    assert get_task(client, task["id"])["escalation_level"] == 0
+
+
+def test_auto_escalation_discards_redo_branch(client, session):
+    task = create_task(client)
+    client.patch(f"/api/tasks/{task['id']}/done")
+    assert client.post(f"/api/tasks/undo/{task['id']}").status_code == 200
+    _make_overdue(session, task["id"])
+
+    scheduled_due_state_pass()
+
+    assert get_task(client, task["id"])["escalation_level"] == 1
+    assert client.post(f"/api/tasks/redo/{task['id']}").status_code == 400
+
+
+def test_nightly_compaction_runs_once_per_day(client, session, monkeypatch):
+    monkeypatch.setattr(jobs, "VERSION_RETENTION", 2)
+    task = create_task(client)
+    for _ in range(4):
+        client.patch(f"/api/tasks/{task['id']}/done")
+
+    assert jobs.scheduled_version_compaction(date(2030, 1, 1)) == 2
+    versions = session.exec(
+        select(TaskVersion).where(TaskVersion.task_id == task["id"]).order_by(TaskVersion.version)
+    ).all()
+    assert [v.version for v in versions] == [3, 4]
+    assert versions[0].is_keyframe
+
+    client.patch(f"/api/tasks/{task['id']}/done")
+    # am selben Tag kein zweiter Lauf, am nächsten wieder
+    assert jobs.scheduled_version_compaction(date(2030, 1, 1)) == 0
+    assert jobs.scheduled_version_compaction(date(2030, 1, 2)) == 1
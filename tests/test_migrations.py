@@ -0,0 +1,120 @@
+import sqlite3
+
+from sqlalchemy import create_engine, inspect
+from sqlmodel import SQLModel
+
+from app.migrations import SCHEMA_VERSION, get_schema_version, migrate_database_file, run_migrations
+
+# Schema vor dem Migrations-Runner (Stand der ersten Version mit create_all)
+BASELINE_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER NOT NULL, name VARCHAR NOT NULL, active BOOLEAN NOT NULL, points INTEGER NOT NULL,
+    profile_image_url VARCHAR, PRIMARY KEY (id)
+);
+CREATE TABLE task (
+    id INTEGER NOT NULL, title VARCHAR NOT NULL, description VARCHAR, created_at DATETIME NOT NULL,
+    due_date DATETIME, is_done BOOLEAN NOT NULL, iteration INTEGER NOT NULL,
+    default_duration_days INTEGER NOT NULL, credits INTEGER NOT NULL, task_type VARCHAR(8) NOT NULL,
+    escalation_level INTEGER NOT NULL, duration_modifier INTEGER NOT NULL, last_completed_at DATETIME,
+    last_done_by INTEGER, before_last_done_by INTEGER, times_completed INTEGER NOT NULL,
+    remaining_days INTEGER NOT NULL, blacklist JSON, user_id INTEGER, PRIMARY KEY (id),
+    FOREIGN KEY(last_done_by) REFERENCES user (id), FOREIGN KEY(before_last_done_by) REFERENCES user (id),
+    FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE tasklog (
+    id INTEGER NOT NULL, task_id INTEGER NOT NULL, user_id INTEGER, user_name VARCHAR,
+    action VARCHAR NOT NULL, timestamp DATETIME NOT NULL, PRIMARY KEY (id),
+    FOREIGN KEY(task_id) REFERENCES task (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+CREATE TABLE assignmentqueue (
+    id INTEGER NOT NULL, task_id INTEGER NOT NULL, user_queue JSON, PRIMARY KEY (id),
+    FOREIGN KEY(task_id) REFERENCES task (id)
+);
+CREATE UNIQUE INDEX ix_assignmentqueue_task_id ON assignmentqueue (task_id);
+CREATE TABLE taskversion (
+    id INTEGER NOT NULL, task_id INTEGER NOT NULL, version INTEGER NOT NULL, user_id INTEGER,
+    user_name VARCHAR, action VARCHAR NOT NULL, timestamp DATETIME NOT NULL, data JSON NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(task_id) REFERENCES task (id), FOREIGN KEY(user_id) REFERENCES user (id)
+);
+INSERT INTO user VALUES (1, 'Anna', 1, 7, NULL), (2, 'Ben', 1, 3, NULL);
+INSERT INTO task VALUES (
+    1, 'Bad putzen', NULL, '2024-01-01 08:00:00.000000', NULL, 0, 4, 7, 3, 'free',
+    0, 0, '2024-01-05 08:00:00.000000', 1, 2, 4, 0, '[]', 2
+);
+INSERT INTO tasklog VALUES (1, 1, 1, 'Anna', 'done', '2024-01-05 08:00:00.000000');
+INSERT INTO assignmentqueue VALUES (1, 1, '[1, 5, 2, 9, 14]');
+"""
+
+
+def _schema(db_engine):
+    inspector = inspect(db_engine)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+    }
+
+
+def _baseline_file(tmp_path):
+    path = tmp_path / "baseline.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+    return path
+
+
+def test_fresh_database_matches_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    assert run_migrations(migrated) == SCHEMA_VERSION
+
+    expected = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    SQLModel.metadata.create_all(expected)
+
+    assert _schema(migrated) == _schema(expected)
+
+
+def test_baseline_database_is_migrated_with_data(tmp_path):
+    path = _baseline_file(tmp_path)
+    db_engine = create_engine(f"sqlite:///{path}")
+
+    assert run_migrations(db_engine) == SCHEMA_VERSION
+    with db_engine.connect() as conn:
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        task = conn.exec_driver_sql(
+            "SELECT title, iteration, user_id, mode, due_at, undo_pointer FROM task WHERE id = 1"
+        ).one()
+        queue = conn.exec_driver_sql("SELECT user_queue, cursor FROM assignmentqueue").one()
+        log = conn.exec_driver_sql("SELECT event, aggregated FROM tasklog WHERE id = 1").one()
+        points = conn.exec_driver_sql("SELECT points FROM user ORDER BY id").scalars().all()
+
+    assert task.title == "Bad putzen"
+    assert task.iteration == 4
+    assert task.user_id == 2
+    assert task.mode == "recurring"
+    # Fälligkeit ab letzter Erledigung + 7 Tage
+    assert task.due_at.startswith("2024-01-12")
+    assert task.undo_pointer is None
+    assert queue.user_queue == "[1, 2]"
+    assert queue.cursor == 1
+    assert log.event == "done"
+    assert log.aggregated
+    assert points == [7, 3]
+
+    # Die Struktur ist danach dieselbe wie bei einer frischen Datenbank
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    run_migrations(fresh)
+    assert _schema(db_engine) == _schema(fresh)
+
+
+def test_migrations_are_skipped_when_current(tmp_path):
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    run_migrations(db_engine)
+    assert run_migrations(db_engine) == 0
+
+
+def test_newer_schema_is_rejected(tmp_path):
+    path = tmp_path / "newer.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+    assert "neueren Version" in migrate_database_file(str(path))
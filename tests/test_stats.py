@@ -0,0 +1,40 @@
+from tests.conftest import create_task, create_user
+
+
+def _task_stats(client, task_id):
+    stats = client.get("/api/stats").json()
+    row = next((t for t in stats["tasks"] if t["task_id"] == task_id), None)
+    user_completions = sum(entry["completions"] for entry in stats["user_weekly"])
+    return (row["completions"], row["escalations"]) if row else (0, 0), user_completions
+
+
+def test_undo_redo_updates_rollups(client):
+    anna = create_user(client, "Anna")
+    task = create_task(client, user_id=anna["id"])
+    client.patch(f"/api/tasks/{task['id']}/done")
+    client.post(f"/api/tasks/{task['id']}/vote-escalate")
+    client.patch(f"/api/tasks/{task['id']}/done")
+    assert _task_stats(client, task["id"]) == ((2, 1), 2)
+
+    client.post(f"/api/tasks/undo/{task['id']}", params={"steps": 2})
+    assert _task_stats(client, task["id"]) == ((1, 0), 1)
+
+    client.post(f"/api/tasks/redo/{task['id']}")
+    assert _task_stats(client, task["id"]) == ((1, 1), 1)
+    client.post(f"/api/tasks/redo/{task['id']}")
+    assert _task_stats(client, task["id"]) == ((2, 1), 2)
+
+
+def test_new_change_after_undo_keeps_old_branch_out(client):
+    task = create_task(client)
+    client.patch(f"/api/tasks/{task['id']}/done")
+    client.post(f"/api/tasks/undo/{task['id']}")
+    assert _task_stats(client, task["id"])[0] == (0, 0)
+
+    # neue Erledigung übernimmt die Versionsnummer des verworfenen Zweigs
+    client.patch(f"/api/tasks/{task['id']}/done")
+    assert _task_stats(client, task["id"])[0] == (1, 0)
+    client.post(f"/api/tasks/undo/{task['id']}")
+    assert _task_stats(client, task["id"])[0] == (0, 0)
+    client.post(f"/api/tasks/redo/{task['id']}")
+    assert _task_stats(client, task["id"])[0] == (1, 0)
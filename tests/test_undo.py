@@ -0,0 +1,86 @@
+from sqlmodel import select
+
+from app.models import TaskVersion
+from app.utils import versions
+from app.utils.versions import reconstruct_task_data
+from tests.conftest import create_task, create_user, get_task
+
+
+def _points(client, user_id):
+    return client.get(f"/api/users/{user_id}").json()["points"]
+
+
+def test_undo_redo_rebooks_credits(client):
+    anna = create_user(client, "Anna")
+    task = create_task(client, credits=3, user_id=anna["id"])
+
+    client.patch(f"/api/tasks/{task['id']}/done")
+    client.patch(f"/api/tasks/{task['id']}/done")
+    assert _points(client, anna["id"]) == 6
+
+    undo = client.post(f"/api/tasks/undo/{task['id']}", params={"steps": 2}).json()
+    assert undo["can_redo"] == 2
+    assert get_task(client, task["id"])["last_completed_at"] is None
+    assert _points(client, anna["id"]) == 0
+
+    redo = client.post(f"/api/tasks/redo/{task['id']}").json()
+    assert redo["can_redo"] == 1
+    assert _points(client, anna["id"]) == 3
+
+    client.post(f"/api/tasks/redo/{task['id']}")
+    assert _points(client, anna["id"]) == 6
+    assert client.post(f"/api/tasks/redo/{task['id']}").status_code == 400
+
+
+def test_reset_after_undo_discards_redo(client):
+    task = create_task(client)
+    client.patch(f"/api/tasks/{task['id']}/done")
+    client.post(f"/api/tasks/undo/{task['id']}")
+
+    client.patch(f"/api/tasks/{task['id']}/reset")
+    reset = get_task(client, task["id"])
+
+    # Der Reset darf nicht durch ein Redo des alten Zweigs überschrieben werden
+    assert client.post(f"/api/tasks/redo/{task['id']}").status_code == 400
+    assert get_task(client, task["id"])["due_date"] == reset["due_date"]
+
+    # ... ist aber selbst rückgängig zu machen
+    assert client.post(f"/api/tasks/undo/{task['id']}").status_code == 200
+    assert get_task(client, task["id"])["last_completed_at"] is None
+
+
+def test_blacklist_after_undo_discards_redo(client):
+    anna = create_user(client, "Anna")
+    task = create_task(client)
+    client.patch(f"/api/tasks/{task['id']}/done")
+    client.post(f"/api/tasks/undo/{task['id']}")
+
+    client.post(f"/api/tasks/{task['id']}/blacklist/{anna['id']}")
+
+    assert client.post(f"/api/tasks/redo/{task['id']}").status_code == 400
+    assert get_task(client, task["id"])["blacklist"] == [anna["id"]]
+    client.post(f"/api/tasks/undo/{task['id']}")
+    assert get_task(client, task["id"])["blacklist"] == []
+
+
+def test_reconstruction_across_keyframes(client, session, monkeypatch):
+    monkeypatch.setattr(versions, "KEYFRAME_INTERVAL", 3)
+    # Ein "T" im Titel darf beim Dekodieren nicht als Datum gelesen werden
+    task = create_task(client, title="T2024-01-01T10:00")
+    for credits in range(1, 8):
+        client.patch(f"/api/tasks/{task['id']}", json={"credits": credits})
+
+    rows = session.exec(
+        select(TaskVersion).where(TaskVersion.task_id == task["id"]).order_by(TaskVersion.version)
+    ).all()
+    assert [row.is_keyframe for row in rows] == [True, False, False, True, False, False, True]
+    # Version v ist der Stand vor Änderung v: credits ist der Wert davor
+    for row in rows:
+        data = reconstruct_task_data(session, task["id"], row.version)
+        assert data["credits"] == (3 if row.version == 1 else row.version - 1)
+        assert data["title"] == "T2024-01-01T10:00"
+
+    client.post(f"/api/tasks/undo/{task['id']}", params={"steps": 5})
+    restored = get_task(client, task["id"])
+    assert restored["credits"] == 2
+    assert restored["title"] == "T2024-01-01T10:00"